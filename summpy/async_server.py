@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import sys
+import os
+import json
+import signal
+import functools
+import threading
+
+import tornado.gen
+import tornado.web
+import tornado.ioloop
+import tornado.queues
+import tornado.iostream
+import tornado.httpserver
+from concurrent.futures import ThreadPoolExecutor
+
+from . import tools
+from . import params
+from . import server
+
+
+class _Handler(tornado.web.RequestHandler):
+    '''
+    base of the handlers.
+    summarizations run in the executor, and self.cancelled is set when the
+    client goes away.
+    '''
+
+    def initialize(self, summarizer, executor):
+        self.summarizer = summarizer
+        self.executor = executor
+        self.cancelled = threading.Event()
+
+    def on_connection_close(self):
+        self.cancelled.set()
+
+    def run(self, func, *args, **kwargs):
+        '''
+        Returns:
+          Future of func(*args, **kwargs) run in the executor
+        '''
+        return tornado.ioloop.IOLoop.current().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def write_json(self, obj, **kwargs):
+        self.set_header('Content-Type', 'application/json')
+        self.write(json.dumps(obj, **kwargs))
+
+
+class SummarizeHandler(_Handler):
+    '''
+    the same as server.Summarizer.summarize
+    '''
+
+    @tornado.gen.coroutine
+    def get(self):
+        text = self.get_argument('text', None)
+        algo = self.get_argument('algo', u'lexrank')
+        # empty fields of a form are not given
+        summarizer_params = dict(
+            (name, self.get_argument(name))
+            for name in self.request.arguments
+            if name not in ('text', 'algo') and self.get_argument(name) != ''
+        )
+        status, result, etag = yield self.run(
+            self.summarizer._handle, text, algo, summarizer_params,
+            if_none_match=self.request.headers.get('If-None-Match'),
+            cancelled=self.cancelled
+        )
+        if self.cancelled.is_set():
+            return
+        self.set_status(status)
+        if etag is not None:
+            self.set_header('ETag', etag)
+        if status == 304:
+            return
+        if status == 503:
+            self.set_header('Retry-After', '1')
+        self.write_json(tools.tree_encode(result), ensure_ascii=False,
+                        indent=2)
+
+    post = get
+
+
+class SummarizeBatchHandler(_Handler):
+    '''
+    the same as server.Summarizer.summarize_batch
+    '''
+
+    @tornado.gen.coroutine
+    def post(self):
+        try:
+            items = server._parse_batch(self.request.body)
+            parallel = max(1, min(int(self.get_argument('parallel', '1')),
+                                  self.summarizer.admission.workers))
+        except ValueError, e:
+            self.set_status(400)
+            self.write_json({'error': str(e)})
+            return
+
+        self.set_header('Content-Type', 'application/x-ndjson')
+        results = tornado.queues.Queue()
+        jobs = enumerate(items)
+
+        @tornado.gen.coroutine
+        def work():
+            # (the iterator is shared by the coroutines on the IOLoop)
+            for index, item in jobs:
+                if self.cancelled.is_set():
+                    return
+                try:
+                    result = yield self.run(
+                        self.summarizer._handle_item, index, item,
+                        self.cancelled
+                    )
+                except Exception, e:
+                    # (post() waits for a result of every item)
+                    result = server._failed_item(index, e)
+                yield results.put(result)
+
+        for _ in range(min(parallel, len(items))):
+            tornado.ioloop.IOLoop.current().spawn_callback(work)
+        try:
+            for _ in range(len(items)):
+                result = yield results.get()
+                self.write(json.dumps(
+                    result, ensure_ascii=False, separators=(',', ':')
+                ).encode('utf-8') + '\n')
+                yield self.flush()
+        except tornado.iostream.StreamClosedError:
+            self.cancelled.set()
+
+
+class MetricsHandler(_Handler):
+
+    def get(self):
+        self.set_header('Content-Type',
+                        'text/plain; version=0.0.4; charset=utf-8')
+        self.write(self.summarizer.metrics())
+
+
+class AlgorithmsHandler(_Handler):
+
+    def get(self):
+        self.write_json(params.describe(), indent=2)
+
+
+class HealthzHandler(_Handler):
+
+    def get(self):
+        self.set_header('Content-Type', 'application/json')
+        self.write(self.summarizer.healthz())
+
+
+def make_app(summarizer, executor=None):
+    '''
+    Args:
+      summarizer: server.Summarizer
+      executor: concurrent.futures.Executor to run summarizations.
+        summarizer.admission limits summarizations also with this, and
+        with the 'process' executor of summarizer, the threads only wait
+        for worker processes. (default: as many threads as requests
+        admitted by summarizer)
+
+    Returns:
+      tornado.web.Application
+    '''
+    if executor is None:
+        admission = summarizer.admission
+        executor = ThreadPoolExecutor(
+            admission.workers + admission.queue_size + server._SPARE_THREADS
+        )
+    args = {'summarizer': summarizer, 'executor': executor}
+    static_dir = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'server_data'
+    )
+    return tornado.web.Application([
+        (r'/summarize', SummarizeHandler, args),
+        (r'/summarize_batch', SummarizeBatchHandler, args),
+        (r'/metrics', MetricsHandler, args),
+        (r'/algorithms', AlgorithmsHandler, args),
+        (r'/healthz', HealthzHandler, args),
+        (r'/static/(.*)', tornado.web.StaticFileHandler,
+         {'path': static_dir}),
+    ])
+
+
+if __name__ == '__main__':
+
+    options = server.parse_options(sys.argv[1:], 'async_server.py')
+    host, port = options['-h'], int(options['-p'])
+    summarizer = server.summarizer_from_options(options)
+    app = make_app(summarizer)
+    # idle keep-alive connections only hold a socket on the IOLoop
+    http_server = tornado.httpserver.HTTPServer(app)
+    http_server.listen(port, address=host)
+
+    loop = tornado.ioloop.IOLoop.current()
+    signal.signal(signal.SIGTERM, lambda signum, frame: (
+        loop.add_callback_from_signal(loop.stop)
+    ))
+    try:
+        loop.start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.stop()
+        if summarizer.pool is not None:
+            summarizer.pool.close()
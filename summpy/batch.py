@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gc
+import os
+import sys
+import json
+import atexit
+import getopt
+import codecs
+import hashlib
+import collections
+import unicodedata
+import multiprocessing
+
+from .misc.cache import LRUCache, DiskStore
+
+
+ALGORITHMS = ('lexrank', 'clexrank', 'divrank', 'mcp')
+
+# change it when results of the same request change
+_RESULT_KEY_VERSION = 1
+
+
+def get_summarizer(algo):
+    '''
+    import summarizers on-demand
+
+    Args:
+      algo: 'lexrank', 'clexrank', 'divrank' or 'mcp'
+
+    Returns: tuple
+      (summarize function, parameters implied by algo)
+    '''
+    if algo in ('lexrank', 'clexrank', 'divrank'):
+        from . import lexrank
+        algo_params = {}
+        if algo == 'clexrank':
+            algo_params['continuous'] = True
+        if algo == 'divrank':
+            algo_params['use_divrank'] = True
+        return lexrank.summarize, algo_params
+    elif algo == 'mcp':
+        from . import mcp_summ
+        return mcp_summ.summarize, {}
+    raise ValueError('unknown algorithm: {}'.format(algo))
+
+
+def warmup(algos=ALGORITHMS):
+    '''
+    import summarizers and the modules they use on-demand, and load the
+    dictionary of the word segmenter, so that the first request is not
+    slow. servers call it before forking worker processes to share them.
+    '''
+    from . import tools
+    for algo in algos:
+        summarizer, _ = get_summarizer(algo)
+        sys.modules[summarizer.__module__].warmup()
+    tools.warmup()
+    # garbage collection untracks tuples and dicts of atomic values (e.g.
+    # entries of the dictionary), so that collections in forked processes
+    # do not touch (and copy) their pages shared with the parent
+    gc.collect()
+
+
+_result_cache = None
+
+
+def configure_result_cache(max_entries=10000, max_bytes=None, ttl=None,
+                           path=None):
+    '''
+    configure the cache of summarize results.
+
+    Args:
+      max_entries: the maximum number of cached results (0 disables cache)
+      max_bytes: the maximum total size of cached results
+        (None: unbounded)
+      ttl: (optional) results expire after ttl seconds
+      path: if given, results are also stored in (and loaded from)
+        a sqlite3 file at the path (bounded by max_entries and ttl)
+    '''
+    global _result_cache
+    if _result_cache is not None and _result_cache.store is not None:
+        _result_cache.store.close()
+
+    if max_entries <= 0:
+        _result_cache = None
+        return
+    store = None
+    if path is not None:
+        store = DiskStore(path, ttl=ttl, max_entries=max_entries)
+    _result_cache = LRUCache(
+        max_entries=max_entries, max_bytes=max_bytes, sizeof=_result_sizeof,
+        store=store, ttl=ttl
+    )
+
+
+def _result_sizeof(result):
+    summary, debug_info = result
+    return (
+        sys.getsizeof(summary) + sum(sys.getsizeof(s) for s in summary)
+        + sys.getsizeof(debug_info)
+    )
+
+
+def result_cache_stats():
+    '''
+    Returns:
+      dict of hits, misses, evictions, expirations, entries and bytes
+      (None if cache is disabled)
+    '''
+    if _result_cache is None:
+        return None
+    return _result_cache.stats()
+
+
+def result_key(text, algo, summarizer_params):
+    '''
+    content-addressed key of a summarize request: hash of the text
+    (NFC normalized, surrounding spaces stripped), algo, parameters and
+    the word segmenter (and its dictionaries).
+
+    Returns:
+      hex string, or None if the result must not be cached
+      (debug results, text that is not unicode, or parameters that are
+      not JSON values)
+    '''
+    if summarizer_params.get('debug'):
+        return None
+    # (byte strings are passed to the summarizer as they are)
+    if not isinstance(text, unicode):
+        return None
+    try:
+        params = json.dumps(summarizer_params, sort_keys=True)
+    except (TypeError, ValueError):  # e.g. sentence_filter
+        return None
+    from . import tools
+    text = unicodedata.normalize('NFC', text).strip()
+    h = hashlib.sha1()
+    h.update('{}\0{}\0{}\0{}\0'.format(
+        _RESULT_KEY_VERSION, algo, params, json.dumps(tools.segmenter_config())
+    ))
+    h.update(text.encode('utf-8'))
+    return h.hexdigest()
+
+
+def cached_result(key):
+    '''
+    Returns:
+      (list of extracted sentences, debug_info) cached with key, or None
+    '''
+    if _result_cache is None or key is None:
+        return None
+    result = _result_cache.get(key)
+    if result is None:
+        return None
+    # (copies, so that callers can modify them)
+    return list(result[0]), dict(result[1])
+
+
+def cache_result(key, summary, debug_info):
+    if _result_cache is not None and key is not None:
+        _result_cache.put(key, (list(summary), dict(debug_info)))
+
+
+def summarize(text, algo='lexrank', use_cache=True, **summarizer_params):
+    '''
+    summarize a text with the given algorithm.
+    results are cached if the cache is configured and use_cache is True.
+
+    Returns:
+      (list of extracted sentences, debug_info)
+    '''
+    summarizer, algo_params = get_summarizer(algo)
+    key = None
+    if use_cache and _result_cache is not None:
+        # (profiler and deadline do not change the result)
+        key = result_key(text, algo, dict(
+            (k, v) for k, v in summarizer_params.iteritems()
+            if k not in ('profiler', 'deadline')
+        ))
+        result = cached_result(key)
+        if result is not None:
+            return result
+    summarizer_params = dict(summarizer_params, **algo_params)
+    summary, debug_info = summarizer(text, **summarizer_params)
+    cache_result(key, summary, debug_info)
+    return summary, debug_info
+
+
+def _summarize_chunk(args):
+    texts, algo, summarizer_params = args
+    return [summarize(text, algo, **summarizer_params) for text in texts]
+
+
+def _chunks(texts, chunksize):
+    chunk = []
+    for text in texts:
+        chunk.append(text)
+        if len(chunk) >= chunksize:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def summarize_iter(texts, algo='lexrank', processes=None, chunksize=16,
+                   max_chunks=None, **summarizer_params):
+    '''
+    summarize many texts in worker processes.
+
+    Args:
+      texts: iterable of texts (unicode string), consumed lazily
+      algo: 'lexrank', 'clexrank', 'divrank' or 'mcp'
+      processes: the number of worker processes
+        (default: the number of cores, 1 runs in the current process)
+      chunksize: the number of texts sent to a worker at once
+      max_chunks: the maximum number of chunks in flight
+        (default: 2 * processes). it bounds the memory held by
+        pending texts and results.
+      summarizer_params: passed to the summarizer of algo
+
+    Returns:
+      generator that yields (list of extracted sentences, debug_info)
+      in the order of texts
+    '''
+    get_summarizer(algo)  # fail fast on unknown algorithms
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if max_chunks is None:
+        max_chunks = 2 * processes
+
+    if processes <= 1:
+        for text in texts:
+            yield summarize(text, algo, **summarizer_params)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = collections.deque()
+        for chunk in _chunks(texts, chunksize):
+            pending.append(pool.apply_async(
+                _summarize_chunk, ((chunk, algo, summarizer_params),)
+            ))
+            if len(pending) >= max_chunks:
+                for res in pending.popleft().get():
+                    yield res
+        while len(pending) > 0:
+            for res in pending.popleft().get():
+                yield res
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def summarize_many(texts, algo='lexrank', processes=None, chunksize=16,
+                   max_chunks=None, **summarizer_params):
+    '''
+    same as summarize_iter but returns a list
+    '''
+    return list(summarize_iter(
+        texts, algo=algo, processes=processes, chunksize=chunksize,
+        max_chunks=max_chunks, **summarizer_params
+    ))
+
+
+configure_result_cache(
+    max_entries=int(os.environ.get('SUMMPY_RESULT_CACHE_SIZE', 0)),
+    ttl=(float(os.environ['SUMMPY_RESULT_CACHE_TTL'])
+         if 'SUMMPY_RESULT_CACHE_TTL' in os.environ else None),
+    path=os.environ.get('SUMMPY_RESULT_CACHE_PATH')
+)
+atexit.register(configure_result_cache, max_entries=0)
+
+
+if __name__ == '__main__':
+
+    _usage = '''
+Usage:
+  python batch.py [ -e <encoding> ] [ -a <algo> ] [ -j <processes> ]
+                  [ -s <sent_limit> ] [ -c <char_limit> ]
+                  <file_name> [ <file_name> ... ]
+  Args:
+    file_name: plain text files to be summarized
+    -e: input and output encoding (default: utf-8)
+    -a: lexrank | clexrank | divrank | mcp (default: lexrank)
+    -j: the number of worker processes (default: the number of cores)
+    -s: summary length (the number of sentences)
+    -c: summary length (the number of charactors)
+    '''.strip()
+
+    options, args = getopt.getopt(sys.argv[1:], 'e:a:j:s:c:')
+    options = dict(options)
+
+    if len(args) == 0:
+        print _usage
+        sys.exit(0)
+
+    encoding = options['-e'] if '-e' in options else 'utf-8'
+    algo = options['-a'] if '-a' in options else 'lexrank'
+    processes = int(options['-j']) if '-j' in options else None
+    summarizer_params = {}
+    if '-s' in options:
+        summarizer_params['sent_limit'] = int(options['-s'])
+    if '-c' in options:
+        summarizer_params['char_limit'] = int(options['-c'])
+
+    texts = (codecs.open(fname, encoding=encoding).read() for fname in args)
+    results = summarize_iter(
+        texts, algo=algo, processes=processes, **summarizer_params
+    )
+    for fname, (sentences, debug_info) in zip(args, results):
+        print '# {}'.format(fname)
+        for sent in sentences:
+            print sent.strip().encode(encoding)
@@ -0,0 +1,535 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import json
+import getopt
+import subprocess
+import platform
+import resource
+import collections
+import multiprocessing
+import numpy
+
+
+_particles = [u'は', u'が', u'を', u'に', u'の', u'と', u'で', u'も']
+_endings = [u'です。', u'ます。', u'した。', u'でしょう。', u'ですか？']
+_kana = [unichr(c) for c in range(0x30A2, 0x30F3)]  # katakana
+_kanji = [unichr(c) for c in range(0x4E00, 0x4E00 + 2000)]
+
+
+def generate_document(n_sents, vocab_size=2000, repeat_rate=0.1,
+                      sent_words=(3, 12), zipf_s=1.0, zipf_q=10.0, seed=0):
+    '''
+    generate a Japanese-like document.
+
+    Args:
+      n_sents: the number of sentences
+      vocab_size: the number of distinct content words
+      repeat_rate: probability that a sentence repeats an earlier one
+      sent_words: (min, max) number of content words in a sentence
+      zipf_s, zipf_q: word frequencies follow Zipf-Mandelbrot distribution,
+        i.e. the probability of the r-th word is proportional to
+        1 / (r + zipf_q) ** zipf_s
+      seed: random seed
+
+    Returns: tuple
+      (text, list of sentences, list of content words of each sentence)
+    '''
+    rand = numpy.random.RandomState(seed)
+    vocab = []
+    for i in range(vocab_size):
+        chars = _kanji if i % 2 == 0 else _kana
+        length = rand.randint(2, 5)
+        vocab.append(u''.join(chars[j] for j in rand.randint(0, len(chars),
+                                                              length)))
+
+    probs = 1.0 / (numpy.arange(1, vocab_size + 1) + zipf_q) ** zipf_s
+    probs /= probs.sum()
+
+    sentences, words_list = [], []
+    for i in range(n_sents):
+        if i > 0 and rand.rand() < repeat_rate:
+            j = rand.randint(0, i)
+            sentences.append(sentences[j])
+            words_list.append(words_list[j])
+            continue
+        n_words = rand.randint(sent_words[0], sent_words[1] + 1)
+        words = [vocab[r] for r in rand.choice(vocab_size, n_words, p=probs)]
+        particles = rand.randint(0, len(_particles), n_words)
+        sent = u''.join(
+            w + _particles[p] for w, p in zip(words[:-1], particles)
+        ) + words[-1] + _endings[rand.randint(0, len(_endings))]
+        sentences.append(sent)
+        words_list.append(words)
+    return u''.join(sentences), sentences, words_list
+
+
+def _tf_vectors(words_list):
+    from .misc.similarity import tf_matrix
+    return tf_matrix([collections.Counter(words) for words in words_list])
+
+
+def _adjacency(words_list):
+    from .misc.similarity import cosine_similarity_graph
+    return cosine_similarity_graph(_tf_vectors(words_list))[0]
+
+
+def _segmenter(name):
+    def prepare(doc):
+        if name == 'mecab':
+            from .misc import mecab_segmenter as segmenter
+        else:
+            from .misc import janome_segmenter as segmenter
+        segmenter.warmup()
+        return segmenter, doc['sentences']
+
+    def run(state):
+        segmenter, sentences = state
+        n_words = sum(len(segmenter.word_segmenter_ja(s)) for s in sentences)
+        return {'words': n_words}
+    return prepare, run
+
+
+def _prepare_split(doc):
+    from . import tools
+    return tools, doc['text']
+
+
+def _run_split(state):
+    tools, text = state
+    return {'sentences': sum(1 for _ in tools.sent_splitter_ja(text))}
+
+
+def _run_vectorize(words_list):
+    X = _tf_vectors(words_list)
+    return {'vocabulary': X.shape[1], 'nonzeros': X.nnz}
+
+
+def _run_similarity(X):
+    from .misc.similarity import cosine_similarity_graph
+    adj, _ = cosine_similarity_graph(X)
+    return {'edges': adj.nnz}
+
+
+# similarity of the pairs that LSH stages should find in most cases
+_HIGH_SIMILARITY = 0.5
+
+
+def _lsh(n_tables, n_bits):
+    '''
+    stage of lsh_similarity_graph.
+    recall is the fraction of the edges of cosine_similarity_graph (the
+    exact graph) found, and recall_high is that of the edges of
+    similarity >= _HIGH_SIMILARITY.
+    '''
+    def run(X):
+        from .misc.similarity import (
+            cosine_similarity_graph, lsh_similarity_graph
+        )
+        adj, _ = lsh_similarity_graph(X, n_tables=n_tables, n_bits=n_bits,
+                                      return_similarity=False)
+
+        def evaluate():
+            exact, sim_mat = cosine_similarity_graph(X)
+            high = sim_mat >= _HIGH_SIMILARITY
+            return {
+                'recall': adj.multiply(exact).nnz / float(exact.nnz or 1),
+                'recall_high': adj.multiply(high).nnz / float(high.nnz or 1)
+            }
+        return {'edges': adj.nnz, 'evaluate': evaluate}
+    return lambda doc: _tf_vectors(doc['words_list']), run, None
+
+
+def _run_similarity_dense(X):
+    from sklearn.metrics import pairwise_distances
+    sim_mat = 1 - pairwise_distances(X, X, metric='cosine')
+    return {'edges': int((sim_mat >= 0.1).sum()) - X.shape[0]}
+
+
+def _prepare_graph(doc):
+    import networkx
+    return networkx.from_scipy_sparse_matrix(
+        _adjacency(doc['words_list']), create_using=networkx.DiGraph()
+    )
+
+
+def _run_pagerank(adj):
+    from .misc.ranking import pagerank_matrix
+    _, n_iter = pagerank_matrix(adj, alpha=0.9, max_iter=1000,
+                                return_n_iter=True)
+    return {'iterations': n_iter}
+
+
+def _run_pagerank_networkx(graph):
+    import networkx
+    networkx.pagerank_scipy(graph, alpha=0.9, max_iter=1000)
+    return {}
+
+
+def _run_divrank_matrix(adj):
+    from .misc.ranking import divrank_matrix
+    _, n_iter = divrank_matrix(adj, d=0.9, max_iter=1000, return_n_iter=True)
+    return {'iterations': n_iter}
+
+
+def _run_divrank(graph):
+    from .misc.divrank import divrank
+    divrank(graph, d=0.9, max_iter=1000)
+    return {}
+
+
+def _run_divrank_scipy(graph):
+    from .misc.divrank import divrank_scipy
+    divrank_scipy(graph, d=0.9, max_iter=1000)
+    return {}
+
+
+# top-k agreement of approximate stages with their references reported
+# by run_benchmark
+_PRECISION_TOP = (10, 100)
+_REFERENCES = {
+    'lexrank_float32': 'lexrank_float64',
+    'divrank_float32': 'divrank_float64',
+    'divrank_adaptive': 'divrank_float64',
+}
+
+
+def _precision(ranker, dtype, adaptive_tol=False):
+    '''
+    stage computing similarities and scores in dtype (and DivRank with
+    adaptive_tol). run_benchmark compares the top sentences of the
+    stages with their _REFERENCES.
+    '''
+    def run(words_list):
+        from .misc.similarity import tf_matrix, cosine_similarity_graph
+        from .misc.ranking import pagerank_matrix, divrank_matrix
+        X = tf_matrix(
+            [collections.Counter(words) for words in words_list], dtype=dtype
+        )
+        adj, _ = cosine_similarity_graph(X, dtype=dtype)
+        if ranker == 'divrank':
+            scores, n_iter = divrank_matrix(
+                adj, d=0.9, max_iter=1000, return_n_iter=True, dtype=dtype,
+                adaptive_tol=adaptive_tol
+            )
+        else:
+            scores, n_iter = pagerank_matrix(adj, alpha=0.9, max_iter=1000,
+                                             return_n_iter=True, dtype=dtype)
+        top = numpy.argsort(-scores, kind='mergesort')[:_PRECISION_TOP[-1]]
+        return {'iterations': n_iter, 'top': top.tolist()}
+    return lambda doc: doc['words_list'], run, None
+
+
+def _top_overlaps(results):
+    '''
+    add topK_overlap (the fraction of the top K sentences of a stage
+    also in the top K of its reference in _REFERENCES) to the results of
+    a document, and remove the top sentences from them.
+    '''
+    tops = dict(
+        (result['stage'], result['info'].pop('top'))
+        for result in results if 'top' in result.get('info', {})
+    )
+    for result in results:
+        stage = result['stage']
+        if stage not in _REFERENCES or stage not in tops:
+            continue
+        exact = tops.get(_REFERENCES[stage])
+        if exact is None:
+            continue
+        for k in _PRECISION_TOP:
+            result['info']['top{}_overlap'.format(k)] = (
+                len(set(tops[stage][:k]) & set(exact[:k]))
+                / float(min(k, len(exact)) or 1)
+            )
+
+
+def _prepare_mcp(doc):
+    from . import mcp_summ
+    tf = collections.Counter(w for words in doc['words_list'] for w in words)
+    A, weights, _ = mcp_summ._incidence(doc['words_list'], tf)
+    costs = numpy.array([len(s) for s in doc['sentences']], dtype=float)
+    char_limit = max(1, int(costs.sum() * 0.1))
+    return mcp_summ, A, weights, costs, char_limit
+
+
+def _run_mcp_greedy(state):
+    mcp_summ, A, weights, costs, char_limit = state
+    selected = mcp_summ._greedy_mcp(A, weights, costs, char_limit)
+    return {'objective': float(mcp_summ._coverage(A, weights, selected)[0])}
+
+
+def _run_mcp_ilp(state):
+    mcp_summ, A, weights, costs, char_limit = state
+    selected, status = mcp_summ._ilp_mcp(
+        A, weights, costs, char_limit, time_limit=60
+    )
+    return {
+        'objective': float(mcp_summ._coverage(A, weights, selected)[0]),
+        'status': status
+    }
+
+
+# stage name -> (prepare(doc) -> state, run(state) -> info, max sentences)
+# (info may have 'evaluate', a function returning more info after the
+# measurement)
+STAGES = collections.OrderedDict([
+    ('split', (_prepare_split, _run_split, None)),
+    ('segment_mecab', _segmenter('mecab') + (None,)),
+    ('segment_janome', _segmenter('janome') + (None,)),
+    ('vectorize', (lambda doc: doc['words_list'], _run_vectorize, None)),
+    ('similarity', (lambda doc: _tf_vectors(doc['words_list']),
+                    _run_similarity, None)),
+    ('similarity_dense', (lambda doc: _tf_vectors(doc['words_list']),
+                          _run_similarity_dense, 20000)),
+    ('similarity_lsh_16x8', _lsh(16, 8)),
+    ('similarity_lsh_8x8', _lsh(8, 8)),
+    ('similarity_lsh_16x6', _lsh(16, 6)),
+    ('pagerank', (lambda doc: _adjacency(doc['words_list']),
+                  _run_pagerank, None)),
+    ('pagerank_networkx', (_prepare_graph, _run_pagerank_networkx, None)),
+    ('divrank_matrix', (lambda doc: _adjacency(doc['words_list']),
+                        _run_divrank_matrix, None)),
+    ('divrank', (_prepare_graph, _run_divrank, 100)),
+    ('divrank_scipy', (_prepare_graph, _run_divrank_scipy, None)),
+    ('lexrank_float64', _precision('lexrank', numpy.float64)),
+    ('lexrank_float32', _precision('lexrank', numpy.float32)),
+    ('divrank_float64', _precision('divrank', numpy.float64)),
+    ('divrank_float32', _precision('divrank', numpy.float32)),
+    ('divrank_adaptive', _precision('divrank', numpy.float64, True)),
+    ('mcp_greedy', (_prepare_mcp, _run_mcp_greedy, None)),
+    ('mcp_ilp', (_prepare_mcp, _run_mcp_ilp, 2000)),
+])
+
+
+_startup_text = u'要約したい文章を入力。短い文章です。'
+
+# name -> code run in a new interpreter (measured from its start)
+STARTUP = collections.OrderedDict([
+    ('import_tools', 'from summpy import tools'),
+    ('import_lexrank', 'from summpy import lexrank'),
+    ('import_mcp_summ', 'from summpy import mcp_summ'),
+    ('import_server', 'from summpy import server'),
+    ('first_lexrank', (
+        'from summpy import batch\n'
+        'batch.summarize({!r}, "lexrank", use_cache=False, sent_limit=1)'
+    ).format(_startup_text)),
+    ('first_mcp', (
+        'from summpy import batch\n'
+        'batch.summarize({!r}, "mcp", use_cache=False, char_limit=20,'
+        ' solver="greedy")'
+    ).format(_startup_text)),
+    ('warmup', 'from summpy import batch\nbatch.warmup()'),
+])
+
+_startup_wrapper = '''
+import time
+start = time.time()
+import sys, json, resource
+exec(sys.argv[1])
+print json.dumps({
+    'wall': time.time() - start,
+    'maxrss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+})
+'''
+
+
+def run_startup_benchmark(stages=None, repeat=3, log=None):
+    '''
+    measure the time from the start of an interpreter to the end of
+    each startup stage (see STARTUP), e.g. the first summarization of a
+    CLI or a new worker process.
+
+    Returns:
+      list of dict of the fastest run of each stage
+    '''
+    # the summpy package being benchmarked
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [root] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else [])
+    )
+    if stages is None:
+        stages = list(STARTUP)
+    results = []
+    for stage in stages:
+        runs = []
+        for _ in range(repeat):
+            proc = subprocess.Popen(
+                [sys.executable, '-c', _startup_wrapper, STARTUP[stage]],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env
+            )
+            out, err = proc.communicate()
+            if proc.returncode != 0:
+                runs = None
+                error = err.strip().splitlines()[-1] if err.strip() else ''
+                break
+            runs.append(json.loads(out.strip().splitlines()[-1]))
+        if runs is None:
+            result = {'stage': stage, 'error': error}
+        else:
+            result = min(runs, key=lambda run: run['wall'])
+            result['stage'] = stage
+        results.append(result)
+        if log is not None:
+            print >>log, 'startup {} {}'.format(
+                stage, result.get('wall', result.get('error'))
+            )
+    return results
+
+
+def _measure(args):
+    '''
+    run a stage (in a fresh worker process) and measure it
+    '''
+    stage, doc_params, repeat = args
+    text, sentences, words_list = generate_document(**doc_params)
+    doc = {'text': text, 'sentences': sentences, 'words_list': words_list}
+    prepare, run, _ = STAGES[stage]
+
+    result = {'stage': stage}
+    try:
+        state = prepare(doc)
+        maxrss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        walls, cpus = [], []
+        for _ in range(repeat):
+            wall, cpu = time.time(), time.clock()
+            info = run(state)
+            walls.append(time.time() - wall)
+            cpus.append(time.clock() - cpu)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # accuracy of approximations (not measured)
+        evaluate = info.pop('evaluate', None)
+        if evaluate is not None:
+            info.update(evaluate())
+    except Exception, e:
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+        return result
+
+    result.update({
+        'wall': min(walls), 'wall_mean': sum(walls) / repeat,
+        'cpu': min(cpus),
+        # ru_maxrss is in kilobytes on Linux
+        'maxrss_kb': maxrss, 'maxrss_increase_kb': maxrss - maxrss_before,
+        'info': info
+    })
+    return result
+
+
+def run_benchmark(sizes, stages=None, repeat=3, vocab_size=2000,
+                  repeat_rate=0.1, seed=0, timeout=300, log=None):
+    '''
+    Args:
+      sizes: list of the number of sentences
+      stages: list of stage names (default: all, see STARTUP and STAGES)
+      repeat: the number of runs of each stage (the fastest is reported)
+      vocab_size, repeat_rate, seed: see generate_document
+      timeout: time limit of each stage in seconds
+      log: (optional) file to print progress
+
+    Returns:
+      dict (JSON serializable) of environment and results
+    '''
+    if stages is None:
+        stages = list(STARTUP) + list(STAGES)
+    startup = run_startup_benchmark(
+        [stage for stage in stages if stage in STARTUP], repeat=repeat,
+        log=log
+    )
+
+    # import modules before forking workers not to measure import time
+    import scipy.sparse
+    import networkx
+    import sklearn.feature_extraction
+    import sklearn.metrics
+    from . import tools, lexrank, mcp_summ
+
+    results = []
+    for n_sents in sizes:
+        doc_params = {
+            'n_sents': n_sents, 'vocab_size': vocab_size,
+            'repeat_rate': repeat_rate, 'seed': seed
+        }
+        doc_results = []
+        for stage in stages:
+            if stage not in STAGES:
+                continue
+            max_sents = STAGES[stage][2]
+            if max_sents is not None and n_sents > max_sents:
+                continue
+            # each stage runs in a new process to measure its peak memory
+            pool = multiprocessing.Pool(1)
+            try:
+                result = pool.apply_async(
+                    _measure, ((stage, doc_params, repeat),)
+                ).get(timeout)
+            except multiprocessing.TimeoutError:
+                result = {'stage': stage, 'error': 'timeout'}
+            finally:
+                pool.terminate()
+                pool.join()
+            result.update(doc_params)
+            doc_results.append(result)
+            if log is not None:
+                print >>log, '{} {} {}'.format(
+                    n_sents, stage, result.get('wall', result.get('error'))
+                )
+        _top_overlaps(doc_results)
+        results.extend(doc_results)
+
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'startup': startup,
+        'results': results
+    }
+
+
+if __name__ == '__main__':
+
+    _usage = '''
+Usage:
+  python benchmark.py [ -n <sizes> ] [ -s <stages> ] [ -r <repeat> ]
+                      [ -v <vocab_size> ] [ -d <repeat_rate> ]
+                      [ -t <timeout> ] [ -o <output_file> ]
+  Args:
+    -n: comma separated numbers of sentences (default: 10,100,1000)
+    -s: comma separated stages (default: all)
+        {}
+    -r: the number of runs of each stage (default: 3)
+    -v: vocabulary size of generated documents (default: 2000)
+    -d: probability that a sentence repeats an earlier one (default: 0.1)
+    -t: time limit of each stage in seconds (default: 300)
+    -o: output JSON file (default: stdout)
+    '''.format(' '.join(list(STARTUP) + list(STAGES))).strip()
+
+    options, args = getopt.getopt(sys.argv[1:], 'n:s:r:v:d:t:o:h')
+    options = dict(options)
+
+    if '-h' in options:
+        print _usage
+        sys.exit(0)
+
+    sizes = [int(n) for n in options.get('-n', '10,100,1000').split(',')]
+    stages = options['-s'].split(',') if '-s' in options else None
+    for stage in stages or []:
+        if stage not in STAGES and stage not in STARTUP:
+            print _usage
+            sys.exit(1)
+
+    report = run_benchmark(
+        sizes, stages=stages, repeat=int(options.get('-r', 3)),
+        vocab_size=int(options.get('-v', 2000)),
+        repeat_rate=float(options.get('-d', 0.1)),
+        timeout=float(options.get('-t', 300)), log=sys.stderr
+    )
+    if '-o' in options:
+        with open(options['-o'], 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print json.dumps(report, indent=2)
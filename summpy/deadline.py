@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Cancelled(DeadlineExceeded):
+    '''
+    the request was cancelled (e.g. the client went away)
+    '''
+    pass
+
+
+class Deadline(object):
+    '''
+    time limit of a request.
+
+    summarizers check it between stages and rankers / solvers in their
+    iterations, and raise DeadlineExceeded when it has passed, or
+    Cancelled when cancelled is set.
+
+    Args:
+      timeout: seconds from now (None: no time limit)
+      cancelled: (optional) threading.Event set to cancel the request.
+        it is not passed to worker processes.
+    '''
+
+    def __init__(self, timeout, cancelled=None):
+        self.timeout = timeout
+        self.expires = (
+            float('inf') if timeout is None else time.time() + timeout
+        )
+        self.cancelled = cancelled
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['cancelled'] = None
+        return state
+
+    def is_cancelled(self):
+        return self.cancelled is not None and self.cancelled.is_set()
+
+    def remaining(self):
+        return self.expires - time.time()
+
+    def expired(self):
+        return time.time() >= self.expires or self.is_cancelled()
+
+    def check(self, where=None):
+        where = '' if where is None else ' in ' + where
+        if self.is_cancelled():
+            raise Cancelled('request cancelled{}'.format(where))
+        if time.time() >= self.expires:
+            raise DeadlineExceeded(
+                'deadline of {}s exceeded{}'.format(self.timeout, where)
+            )
+
+    def fraction(self, ratio):
+        '''
+        Returns:
+          new Deadline that expires after ratio of the remaining time
+          (and is cancelled with this one)
+        '''
+        if self.timeout is None:
+            return Deadline(None, self.cancelled)
+        return Deadline(max(0.0, self.remaining()) * ratio, self.cancelled)
+
+
+def check(deadline, where=None):
+    '''
+    deadline.check(where) if deadline is given
+    '''
+    if deadline is not None:
+        deadline.check(where)
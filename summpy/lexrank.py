@@ -6,16 +6,33 @@ import getopt
 import codecs
 import collections
 import numpy
-import networkx
-from sklearn.feature_extraction import DictVectorizer
-from sklearn.metrics import pairwise_distances
+import scipy.sparse
 
 from . import tools
-from .misc.divrank import divrank, divrank_scipy
+from .profiling import get_profiler
+from .deadline import check as check_deadline
+from .misc.dedup import near_duplicates
+from .misc.ranking import pagerank_matrix, divrank_matrix
+from .misc.similarity import (
+    cosine_similarity_graph, cosine_similarity_matrix, lsh_similarity_graph,
+    tf_matrix
+)
+
+
+def warmup():
+    '''
+    import modules of backend='networkx' (imported on first use)
+    '''
+    import networkx
+    from .misc import divrank
 
 
 def lexrank(sentences, continuous=False, sim_threshold=0.1, alpha=0.9,
-            use_divrank=False, divrank_alpha=0.25):
+            use_divrank=False, divrank_alpha=0.25, top_k=None,
+            block_size=1024, backend='matrix', dtype='float64',
+            return_similarity='sparse', return_array=False,
+            dedup_threshold=None, dedup_prior=True, lsh_tables=None,
+            lsh_bits=8, profiler=None, deadline=None):
     '''
     compute centrality score of sentences.
 
@@ -28,6 +45,38 @@ def lexrank(sentences, continuous=False, sim_threshold=0.1, alpha=0.9,
       divrank: if True, apply DivRank instead of PageRank
       divrank_alpha: strength of self-link [0.0-1.0]
         (it's not the damping factor, see divrank.py)
+      top_k: if given, link each sentence to at most top_k most similar
+        sentences (in addition to the sim_threshold condition)
+      block_size: the number of sentences whose similarities are computed
+        at once (see misc/similarity.py)
+      backend: 'matrix' (default) ranks the adjacency matrix directly
+        (see misc/ranking.py), 'networkx' builds a networkx graph and
+        ranks it with networkx.pagerank_scipy or divrank_scipy
+      dtype: 'float64' or 'float32' for vectors, similarities and
+        ranking (networkx ranks in float64). float32 halves the memory
+        of large documents, and the top sentences are mostly the same.
+      return_similarity: similarities returned with the scores,
+        'sparse' (default) the linked pairs as a csr_matrix,
+        'dense' all the pairs as an (N, N) numpy.ndarray, or
+        'none' (None is returned, which saves memory of large documents)
+      return_array: if True, also returns the scores as a numpy.ndarray
+      dedup_threshold: if given, exact and near duplicate sentences
+        (Jaccard similarity of words >= dedup_threshold, see
+        misc/dedup.py) are merged into one node before ranking.
+        the first sentence of a group gets the score of the node, and
+        the others get 0.0 (so that they are not selected twice), and
+        similarities are those of the nodes of the sentences.
+      dedup_prior: if True, the number of sentences merged into a node
+        is its personalization (teleport) weight
+      lsh_tables: if given, similar sentences are searched approximately
+        with lsh_tables hash tables of lsh_bits random hyperplanes
+        (see misc/similarity.py lsh_similarity_graph), which is faster
+        for tens of thousands of sentences. more tables or fewer bits
+        find more of the similar pairs in more time.
+      lsh_bits: the number of random hyperplanes of an LSH table
+      profiler: (optional) profiling.Profiler to record stages
+      deadline: (optional) deadline.Deadline, DeadlineExceeded is raised
+        when it has passed (checked between stages and in ranking)
 
     Returns: tuple
       (
@@ -37,72 +86,154 @@ def lexrank(sentences, continuous=False, sim_threshold=0.1, alpha=0.9,
           1: 0.002,
           ...
         },
-        similarity_matrix
+        similarity_matrix (see return_similarity),
+        numpy.ndarray of the scores (only if return_array)
       )
-    
+
     Reference:
       Günes Erkan and Dragomir R. Radev.
       LexRank: graph-based lexical centrality as salience in text
       summarization. (section 3)
       http://www.cs.cmu.edu/afs/cs/project/jair/pub/volume22/erkan04a-html/erkan04a.html
     '''
+    if backend not in ('matrix', 'networkx'):
+        raise ValueError('unknown backend: {}'.format(backend))
+    if dtype not in ('float64', 'float32'):
+        raise ValueError('unknown dtype: {}'.format(dtype))
+    dtype = numpy.dtype(dtype)
+    if return_similarity not in ('none', 'sparse', 'dense'):
+        raise ValueError(
+            'unknown return_similarity: {}'.format(return_similarity)
+        )
+    profiler = get_profiler(profiler)
+
     # configure ranker
+    if backend == 'networkx':
+        import networkx
+        from .misc.divrank import divrank_scipy
     ranker_params = {'max_iter': 1000}
+    if backend == 'matrix':
+        ranker_params['dtype'] = dtype
     if use_divrank:
-        ranker = divrank_scipy
+        if backend == 'matrix':
+            ranker = divrank_matrix
+            ranker_params['deadline'] = deadline
+        else:
+            ranker = divrank_scipy
         ranker_params['alpha'] = divrank_alpha
         ranker_params['d'] = alpha
     else:
-        ranker = networkx.pagerank_scipy
+        if backend == 'matrix':
+            ranker = pagerank_matrix
+            ranker_params['deadline'] = deadline
+        else:
+            ranker = networkx.pagerank_scipy
         ranker_params['alpha'] = alpha
 
-    graph = networkx.DiGraph()
-
     # sentence -> tf
-    sent_tf_list = []
-    for sent in sentences:
-        words = tools.word_segmenter_ja(sent)
-        tf = collections.Counter(words)
-        sent_tf_list.append(tf)
+    with profiler.stage('segment', sentences=len(sentences)) as record:
+        sent_tf_list = []
+        for sent in sentences:
+            check_deadline(deadline, 'segment')
+            words = tools.word_segmenter_ja(sent)
+            tf = collections.Counter(words)
+            sent_tf_list.append(tf)
+        record['words'] = sum(sum(tf.itervalues()) for tf in sent_tf_list)
 
-    sent_vectorizer = DictVectorizer(sparse=True)
-    sent_vecs = sent_vectorizer.fit_transform(sent_tf_list)
+    N = len(sentences)
+    if dedup_threshold is not None:
+        check_deadline(deadline, 'dedup')
+        with profiler.stage('dedup') as record:
+            groups, representatives, counts = near_duplicates(
+                sentences, sent_tf_list, threshold=dedup_threshold
+            )
+            sent_tf_list = [sent_tf_list[i] for i in representatives]
+            record['duplicates'] = N - len(representatives)
+        if dedup_prior:
+            if backend == 'matrix':
+                ranker_params['personalization'] = counts
+            else:
+                ranker_params['personalization'] = dict(
+                    enumerate(counts.tolist())
+                )
 
-    # compute similarities between senteces
-    sim_mat = 1 - pairwise_distances(sent_vecs, sent_vecs, metric='cosine')
+    check_deadline(deadline, 'vectorize')
+    with profiler.stage('vectorize') as record:
+        sent_vecs = tf_matrix(sent_tf_list, dtype=dtype)
+        record['vocabulary'] = sent_vecs.shape[1]
+        record['nonzeros'] = sent_vecs.nnz
 
-    if continuous:
-        linked_rows, linked_cols = numpy.where(sim_mat > 0)
-    else:
-        linked_rows, linked_cols = numpy.where(sim_mat >= sim_threshold)
+    # compute similarities between senteces and link similar ones
+    check_deadline(deadline, 'similarity')
+    with profiler.stage('similarity') as record:
+        if lsh_tables is None:
+            adj, sim_mat = cosine_similarity_graph(
+                sent_vecs, sim_threshold=sim_threshold,
+                continuous=continuous, top_k=top_k, block_size=block_size,
+                dtype=dtype, return_similarity=return_similarity == 'sparse'
+            )
+        else:
+            adj, sim_mat = lsh_similarity_graph(
+                sent_vecs, sim_threshold=sim_threshold,
+                continuous=continuous, top_k=top_k, n_tables=lsh_tables,
+                n_bits=lsh_bits, dtype=dtype,
+                return_similarity=return_similarity == 'sparse'
+            )
+        if return_similarity == 'dense':
+            sim_mat = cosine_similarity_matrix(sent_vecs, dtype=dtype)
+        record['edges'] = adj.nnz
+
+    check_deadline(deadline, 'rank')
+    with profiler.stage('rank', ranker=ranker.__name__) as record:
+        if backend == 'matrix':
+            score_array, record['iterations'] = ranker(
+                adj, return_n_iter=True, **ranker_params
+            )
+            scores = dict(enumerate(score_array.tolist()))
+        else:
+            # create similarity graph
+            graph = networkx.from_scipy_sparse_matrix(
+                adj, create_using=networkx.DiGraph()
+            )
+            scores = ranker(graph, **ranker_params)
+            score_array = numpy.array(
+                [scores[i] for i in range(adj.shape[0])], dtype=dtype
+            )
 
-    # create similarity graph
-    graph.add_nodes_from(range(sent_vecs.shape[0]))
-    for i, j in zip(linked_rows, linked_cols):
-        if i == j:
-            continue
-        weight = sim_mat[i,j] if continuous else 1.0
-        graph.add_edge(i, j, {'weight': weight})
+    if dedup_threshold is not None:
+        # map nodes back to the sentences
+        node_scores, score_array = score_array, numpy.zeros(N, dtype=dtype)
+        score_array[representatives] = node_scores
+        scores = dict(enumerate(score_array.tolist()))
+        if return_similarity == 'dense':
+            sim_mat = sim_mat[numpy.ix_(groups, groups)]
+        elif return_similarity == 'sparse':
+            P = scipy.sparse.csr_matrix(
+                (numpy.ones(N, dtype=dtype), (numpy.arange(N), groups)),
+                shape=(N, len(representatives))
+            )
+            sim_mat = (P * sim_mat * P.T).tocsr()
 
-    scores = ranker(graph, **ranker_params)
+    if return_array:
+        return scores, sim_mat, score_array
     return scores, sim_mat
 
 
-def summarize(text, sent_limit=None, char_limit=None, imp_require=None,
-              debug=False, **lexrank_params):
+def select_sentences(sentences, scores, sent_limit=None, char_limit=None,
+                     imp_require=None):
     '''
+    select sentences in descending order of scores until a limit is reached.
+
     Args:
-      text: text to be summarized (unicode string)
+      sentences: list of sentences
+      scores: dict of sentence index -> score
       sent_limit: summary length (the number of sentences)
       char_limit: summary length (the number of characters)
-      imp_require: cumulative LexRank score [0.0-1.0]
+      imp_require: cumulative score [0.0-1.0]
 
     Returns:
-      list of extracted sentences
+      list of selected sentences (in the original order)
     '''
-    debug_info = {}
-    sentences = list(tools.sent_splitter_ja(text))
-    scores, sim_mat = lexrank(sentences, **lexrank_params)
     sum_scores = sum(scores.itervalues())
     acc_scores = 0.0
     indexes = set()
@@ -120,13 +251,45 @@ def summarize(text, sent_limit=None, char_limit=None, imp_require=None,
         acc_scores += scores[i]
 
     if len(indexes) > 0:
-        summary_sents = [sentences[i] for i in sorted(indexes)]
+        return [sentences[i] for i in sorted(indexes)]
     else:
-        summary_sents = sentences
+        return sentences
+
+
+def summarize(text, sent_limit=None, char_limit=None, imp_require=None,
+              debug=False, profiler=None, **lexrank_params):
+    '''
+    Args:
+      text: text to be summarized (unicode string)
+      sent_limit: summary length (the number of sentences)
+      char_limit: summary length (the number of characters)
+      imp_require: cumulative LexRank score [0.0-1.0]
+      debug: if True, debug_info contains sentences, scores and profile
+        (wall/CPU time and sizes of each stage)
+      profiler: (optional) profiling.Profiler to record stages
+
+    Returns:
+      list of extracted sentences
+    '''
+    debug_info = {}
+    profiler = get_profiler(profiler, debug)
+
+    with profiler.stage('split', chars=len(text)) as record:
+        sentences = list(tools.sent_splitter_ja(text))
+        record['sentences'] = len(sentences)
+    # (similarities are not used)
+    scores, _ = lexrank(sentences, return_similarity='none', profiler=profiler,
+                        **lexrank_params)
+    with profiler.stage('select'):
+        summary_sents = select_sentences(
+            sentences, scores, sent_limit=sent_limit, char_limit=char_limit,
+            imp_require=imp_require
+        )
 
     if debug:
         debug_info.update({
-            'sentences': sentences, 'scores': scores
+            'sentences': sentences, 'scores': scores,
+            'profile': list(profiler.records)
         })
 
     return summary_sents, debug_info
@@ -162,22 +325,28 @@ Usage:
     char_limit = int(options['-c']) if '-c' in options else None
     imp_require = float(options['-i']) if '-i' in options else None
 
-    if fname == 'stdin':
-        text = '\n'.join(
-            line for line in sys.stdin.readlines()
-        ).decode(encoding)
-    else:
-        text = codecs.open(fname, encoding=encoding).read()
-
     lexrank_params = {}
     if variant == 'clexrank':
         lexrank_params['continuous'] = True
     if variant == 'divrank':
         lexrank_params['use_divrank'] = True
 
-    sentences, debug_info = summarize(
-        text, sent_limit=sent_limit, char_limit=char_limit,
-        imp_require=imp_require, **lexrank_params
-    )
+    if fname == 'stdin':
+        # summarize lines incrementally instead of reading all of them
+        from .stream import IncrementalSummarizer
+        summarizer = IncrementalSummarizer(**lexrank_params)
+        for line in iter(sys.stdin.readline, ''):
+            summarizer.feed(line.decode(encoding))
+        summarizer.flush()
+        sentences, debug_info = summarizer.summarize(
+            sent_limit=sent_limit, char_limit=char_limit,
+            imp_require=imp_require
+        )
+    else:
+        text = codecs.open(fname, encoding=encoding).read()
+        sentences, debug_info = summarize(
+            text, sent_limit=sent_limit, char_limit=char_limit,
+            imp_require=imp_require, **lexrank_params
+        )
     for sent in sentences:
         print sent.strip().encode(encoding)
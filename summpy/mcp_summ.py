@@ -5,18 +5,287 @@ import sys
 import getopt
 import codecs
 import collections
-import pulp
+import numpy
+import scipy.sparse
 
 from . import tools
+from .profiling import get_profiler
+from .deadline import check as check_deadline
 
 
-def summarize(text, char_limit, sentence_filter=None, debug=False):
+def _incidence(words_list, tf):
+    '''
+    Returns: tuple
+      (
+        sentence x word binary incidence (scipy.sparse.csr_matrix),
+        word weights (numpy.ndarray),
+        list of words (column index -> word)
+      )
+    '''
+    vocab = sorted(tf)
+    word2col = dict((w, j) for j, w in enumerate(vocab))
+    rows, cols = [], []
+    for i, words in enumerate(words_list):
+        for j in set(word2col[w] for w in words):
+            rows.append(i)
+            cols.append(j)
+    A = scipy.sparse.csr_matrix(
+        (numpy.ones(len(rows)), (rows, cols)),
+        shape=(len(words_list), len(vocab))
+    )
+    weights = numpy.array([tf[w] for w in vocab], dtype=float)
+    return A, weights, vocab
+
+
+def _coverage(A, weights, selected):
+    '''
+    Returns: tuple
+      (objective value, the number of selected sentences covering each word)
+    '''
+    counts = numpy.asarray(
+        A[numpy.flatnonzero(selected)].sum(axis=0)
+    ).ravel()
+    return weights[counts > 0].sum(), counts
+
+
+def _greedy_mcp(A, weights, costs, char_limit, deadline=None):
+    '''
+    budgeted greedy algorithm: add the sentence with the largest
+    (newly covered weight) / (length) while it fits in char_limit, and
+    compare the result with the best single sentence.
+    it achieves at least (1 - 1/e) / 2 of the optimal objective.
+    DeadlineExceeded is raised if deadline passes.
+
+    Returns:
+      boolean array of selected sentences
+    '''
+    n_sents = A.shape[0]
+    A_csc = A.tocsc()
+    selected = numpy.zeros(n_sents, dtype=bool)
+    candidate = costs <= char_limit
+    covered = numpy.zeros(A.shape[1], dtype=bool)
+    gains = A.dot(weights)
+    budget = float(char_limit)
+
+    while True:
+        check_deadline(deadline, 'greedy')
+        candidate &= costs <= budget
+        if not candidate.any():
+            break
+        ratios = numpy.where(candidate, gains / costs, -1.0)
+        i = ratios.argmax()
+        if gains[i] <= 0:
+            break
+        selected[i] = True
+        candidate[i] = False
+        budget -= costs[i]
+        # words newly covered by sentence i no longer contribute to gains
+        new_words = A.indices[A.indptr[i]:A.indptr[i + 1]]
+        new_words = new_words[~covered[new_words]]
+        covered[new_words] = True
+        gains -= A_csc[:, new_words].dot(weights[new_words])
+
+    # best single sentence
+    single_gains = numpy.where(costs <= char_limit, A.dot(weights), -1.0)
+    best = single_gains.argmax()
+    if single_gains[best] > weights[covered].sum():
+        selected[:] = False
+        selected[best] = True
+    return selected
+
+
+def _local_search_mcp(A, weights, costs, char_limit, selected,
+                      max_rounds=10, deadline=None):
+    '''
+    improve a solution by swapping a selected sentence for an unselected one
+    (or adding one) while the objective increases.
+    the search stops with the current solution when deadline passes.
+
+    Returns:
+      boolean array of selected sentences
+    '''
+    selected = selected.copy()
+    objective, counts = _coverage(A, weights, selected)
+    for _ in range(max_rounds):
+        improved = False
+        for i in numpy.flatnonzero(selected).tolist() + [None]:
+            if deadline is not None and deadline.expired():
+                return selected
+            # remove sentence i (None: remove nothing)
+            counts_i = counts.copy()
+            if i is not None:
+                counts_i[A.indices[A.indptr[i]:A.indptr[i + 1]]] -= 1
+            objective_i = weights[counts_i > 0].sum()
+            budget = char_limit - costs[selected].sum()
+            if i is not None:
+                budget += costs[i]
+            gains = A.dot(weights * (counts_i == 0))
+            gains[selected | (costs > budget)] = -1.0
+            j = gains.argmax()
+            if gains[j] > 0 and objective_i + gains[j] > objective + 1e-9:
+                if i is not None:
+                    selected[i] = False
+                selected[j] = True
+                objective, counts = _coverage(A, weights, selected)
+                improved = True
+        if not improved:
+            break
+    return selected
+
+
+def warmup():
+    '''
+    import pulp (imported on first use of the ilp solver) if available
+    '''
+    try:
+        import pulp
+    except ImportError:
+        pass
+
+
+def _cbc_solver(time_limit=None, mip_gap=None, threads=None,
+                warm_start=False):
+    '''
+    returns pulp.PULP_CBC_CMD with options
+    (argument names differ between pulp versions)
+    '''
+    import inspect
+    import pulp
+
+    arg_names = inspect.getargspec(pulp.PULP_CBC_CMD.__init__).args
+    params = {'msg': 0}
+    if time_limit is not None:
+        name = 'timeLimit' if 'timeLimit' in arg_names else 'maxSeconds'
+        params[name] = time_limit
+    if mip_gap is not None:
+        name = 'gapRel' if 'gapRel' in arg_names else 'fracGap'
+        params[name] = mip_gap
+    if threads is not None:
+        params['threads'] = threads
+    if warm_start:  # (not supported by old versions)
+        for name in ('warmStart', 'mip_start'):
+            if name in arg_names:
+                params[name] = True
+                break
+    return pulp.PULP_CBC_CMD(**params)
+
+
+def _ilp_mcp(A, weights, costs, char_limit, initial=None, time_limit=None,
+             mip_gap=None, threads=None, deadline=None):
+    '''
+    solve the maximum coverage problem by integer linear programming (pulp)
+
+    Args:
+      initial: boolean array of selected sentences used as a warm start
+      time_limit: time limit of the solver in seconds
+      mip_gap: relative gap tolerance of the solver
+      threads: the number of threads of the solver
+      deadline: (optional) deadline.Deadline. the problem must be built
+        before it passes, and the time limit of the solver is cut to it.
+
+    Returns: tuple
+      (boolean array of selected sentences, solver status)
+      if the solver stopped without a solution better than initial
+      (e.g. time limit), initial is returned.
+    '''
+    import pulp
+
+    n_sents, n_words = A.shape
+    A_csc = A.tocsc()
+
+    prob = pulp.LpProblem('summarize', pulp.LpMaximize)
+
+    # x
+    sent_vars = [
+        pulp.LpVariable('x{}'.format(i), 0, 1, pulp.LpBinary)
+        for i in range(n_sents)
+    ]
+    # z
+    word_vars = [
+        pulp.LpVariable('z{}'.format(j), 0, 1, pulp.LpBinary)
+        for j in range(n_words)
+    ]
+
+    # first, set objective function: sum(w*z)
+    prob += pulp.LpAffineExpression(zip(word_vars, weights.tolist()))
+
+    # next, add constraints
+    # limit summary length: sum(c*x) <= K
+    prob += pulp.LpAffineExpression(
+        zip(sent_vars, costs.tolist())
+    ) <= char_limit, 'lengthRequirement'
+    # for each term, sum(a*x) >= z (only sentences containing the term)
+    for j in range(n_words):
+        if j % 1000 == 0:
+            check_deadline(deadline, 'ilp')
+        sents = A_csc.indices[A_csc.indptr[j]:A_csc.indptr[j + 1]]
+        expr = pulp.LpAffineExpression([(sent_vars[i], 1) for i in sents])
+        expr.addterm(word_vars[j], -1)
+        prob += expr >= 0, 'z{}'.format(j)
+
+    if initial is not None:
+        _, counts = _coverage(A, weights, initial)
+        for v, value in zip(sent_vars, initial):
+            v.setInitialValue(int(value))
+        for v, count in zip(word_vars, counts):
+            v.setInitialValue(int(count > 0))
+
+    if deadline is not None:
+        check_deadline(deadline, 'ilp')
+        remaining = deadline.remaining()
+        if time_limit is None or time_limit > remaining:
+            time_limit = remaining
+    prob.solve(_cbc_solver(
+        time_limit=time_limit, mip_gap=mip_gap, threads=threads,
+        warm_start=initial is not None
+    ))
+    status = pulp.LpStatus[prob.status]
+
+    values = [v.varValue for v in sent_vars]
+    if all(value is not None for value in values):
+        selected = numpy.array(values) > 0.5
+        if costs[selected].sum() > char_limit:  # not a feasible solution
+            selected = None
+    else:
+        selected = None
+
+    if initial is not None and (
+            selected is None
+            or _coverage(A, weights, selected)[0]
+            < _coverage(A, weights, initial)[0]):
+        selected = initial
+    elif selected is None:
+        selected = numpy.zeros(n_sents, dtype=bool)
+    return selected, status
+
+
+SOLVERS = ('ilp', 'greedy', 'local_search')
+
+
+def summarize(text, char_limit, sentence_filter=None, debug=False,
+              solver='ilp', time_limit=None, mip_gap=None, threads=None,
+              warm_start=True, profiler=None, deadline=None):
     '''
     select sentences in terms of maximum coverage problem
 
     Args:
       text: text to be summarized (unicode string)
       char_limit: summary length (the number of characters)
+      solver:
+        - 'ilp' (default) exact solution by integer linear programming (pulp)
+        - 'greedy' budgeted greedy algorithm (fast, approximate)
+        - 'local_search' greedy solution improved by swapping sentences
+      time_limit: (ilp only) time limit of the solver in seconds.
+        the best solution found within the limit is returned.
+      mip_gap: (ilp only) relative gap tolerance of the solver
+      threads: (ilp only) the number of threads of the solver
+      warm_start: (ilp only) if True, start from the greedy solution
+      debug: if True, debug_info contains profile
+        (wall/CPU time and sizes of each stage)
+      profiler: (optional) profiling.Profiler to record stages
+      deadline: (optional) deadline.Deadline. DeadlineExceeded is raised
+        when it passes before a solution is found. ilp and local_search
+        return the best solution found so far instead.
 
     Returns:
       list of extracted sentences
@@ -27,13 +296,21 @@ def summarize(text, char_limit, sentence_filter=None, debug=False):
       variant. (section 3)
       http://citeseerx.ist.psu.edu/viewdoc/summary?doi=10.1.1.222.6945
     '''
+    if solver not in SOLVERS:
+        raise ValueError('unknown solver: {}'.format(solver))
+
     debug_info = {}
+    profiler = get_profiler(profiler, debug)
 
-    sents = list(tools.sent_splitter_ja(text))
-    words_list = [
-        # pulp variables should be utf-8 encoded
-        w.encode('utf-8') for s in sents for w in tools.word_segmenter_ja(s)
-    ]
+    with profiler.stage('split', chars=len(text)) as record:
+        sents = list(tools.sent_splitter_ja(text))
+        record['sentences'] = len(sents)
+    with profiler.stage('segment', sentences=len(sents)) as record:
+        words_list = []
+        for s in sents:
+            check_deadline(deadline, 'segment')
+            words_list.append(tools.word_segmenter_ja(s))
+        record['words'] = sum(len(words) for words in words_list)
 
     tf = collections.Counter()
     for words in words_list:
@@ -45,46 +322,46 @@ def summarize(text, char_limit, sentence_filter=None, debug=False):
         sents = [sents[i] for i in valid_indices]
         words_list = [words_list[i] for i in valid_indices]
 
-    sent_ids = [str(i) for i in range(len(sents))]  # sentence id
-    sent_id2len = dict((id_, len(s)) for id_, s in zip(sent_ids, sents))  # c
-
-    word_contain = dict()  # a
-    for id_, words in zip(sent_ids, words_list):
-        word_contain[id_] = collections.defaultdict(lambda: 0)
-        for w in words:
-            word_contain[id_][w] = 1
-
-    prob = pulp.LpProblem('summarize', pulp.LpMaximize)
+    if len(sents) == 0:
+        debug_info['objective'] = 0.0
+        return [], debug_info
 
-    # x
-    sent_vars = pulp.LpVariable.dicts('sents', sent_ids, 0, 1, pulp.LpBinary)
-    # z
-    word_vars = pulp.LpVariable.dicts('words', tf.keys(), 0, 1, pulp.LpBinary)
+    check_deadline(deadline, 'vectorize')
+    with profiler.stage('vectorize') as record:
+        A, weights, _ = _incidence(words_list, tf)
+        costs = numpy.array([len(s) for s in sents], dtype=float)
+        record['vocabulary'] = A.shape[1]
+        record['nonzeros'] = A.nnz
 
-    # first, set objective function: sum(w*z)
-    prob += pulp.lpSum([tf[w] * word_vars[w] for w in tf])
-
-    # next, add constraints
-    # limit summary length: sum(c*x) <= K
-    prob += pulp.lpSum(
-        [sent_id2len[id_] * sent_vars[id_] for id_ in sent_ids]
-    ) <= char_limit, 'lengthRequirement'
-    # for each term, sum(a*x) <= z
-    for w in tf:
-        prob += pulp.lpSum(
-            [word_contain[id_][w] * sent_vars[id_] for id_ in sent_ids]
-        ) >= word_vars[w], 'z:{}'.format(w)
+    check_deadline(deadline, 'solve')
+    with profiler.stage('solve', solver=solver) as record:
+        if solver == 'ilp':
+            initial = None
+            if warm_start:
+                initial = _greedy_mcp(A, weights, costs, char_limit,
+                                      deadline=deadline)
+            selected, debug_info['status'] = _ilp_mcp(
+                A, weights, costs, char_limit, initial=initial,
+                time_limit=time_limit, mip_gap=mip_gap, threads=threads,
+                deadline=deadline
+            )
+            record['status'] = debug_info['status']
+        else:
+            selected = _greedy_mcp(A, weights, costs, char_limit,
+                                   deadline=deadline)
+            if solver == 'local_search':
+                selected = _local_search_mcp(
+                    A, weights, costs, char_limit, selected,
+                    deadline=deadline
+                )
 
-    prob.solve()
-    # print("Status:", pulp.LpStatus[prob.status])
+        objective, _ = _coverage(A, weights, selected)
+        debug_info['objective'] = record['objective'] = float(objective)
 
-    sent_indices = []
-    for v in prob.variables():
-        # print v.name, "=", v.varValue
-        if v.name.startswith('sents') and v.varValue == 1:
-            sent_indices.append(int(v.name.split('_')[-1]))
+    if debug:
+        debug_info['profile'] = list(profiler.records)
 
-    return [sents[i] for i in sent_indices], debug_info
+    return [sents[i] for i in numpy.flatnonzero(selected)], debug_info
 
 
 if __name__ == '__main__':
@@ -92,14 +369,16 @@ if __name__ == '__main__':
     _usage = '''
 Usage:
   python mcp_summ.py -f <file_name> [ -e <encoding> ] -c <char_limit>
+                     [ -m ilp | greedy | local_search ]
 
   Args:
     file_name: plain text file to be summarized
     encoding: input and output encoding (default: utf-8)
     char_limit: summary length (the number of charactors)
+    solver: solver of maximum coverage problem (default: ilp)
     '''.strip()
 
-    options, args = getopt.getopt(sys.argv[1:], 'f:c:')
+    options, args = getopt.getopt(sys.argv[1:], 'f:e:c:m:')
     options = dict(options)
 
     if len(options) < 2:
@@ -109,6 +388,7 @@ Usage:
     fname = options['-f']
     encoding = options['-e'] if '-e' in options else 'utf-8'
     char_limit = int(options['-c']) if '-c' in options else None
+    solver = options['-m'] if '-m' in options else 'ilp'
 
     if fname == 'stdin':
         text = '\n'.join(
@@ -120,7 +400,8 @@ Usage:
     # example sentence filter
     #not_too_short = lambda s: True if len(s) > 20 else False
 
-    sentences, debug_info = summarize(text, char_limit=char_limit)
+    sentences, debug_info = summarize(text, char_limit=char_limit,
+                                      solver=solver)
                                       #sentence_filter=not_too_short)
     for sent in sentences:
         print sent.strip().encode(encoding)
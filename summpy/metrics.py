@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value) if isinstance(value, (int, long)) else repr(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if len(pairs) == 0:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            unicode(value).replace(u'\\', u'\\\\').replace(u'"', u'\\"')
+            .replace(u'\n', u'\\n').encode('utf-8')
+        )
+        for name, value in pairs
+    ) + '}'
+
+
+class _Metric(object):
+    '''
+    if func is given, values are computed when collected.
+    func returns dict of label values (tuple) -> value.
+    '''
+
+    type_ = None
+
+    def __init__(self, name, doc, labels=(), func=None):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self.func = func
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> value
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.label_names)
+
+    def samples(self):
+        '''
+        Returns:
+          list of (name suffix, label values, extra labels, value)
+        '''
+        if self.func is not None:
+            return [
+                ('', key, (), value)
+                for key, value in sorted(self.func().items())
+            ]
+        with self._lock:
+            return [
+                ('', key, (), value)
+                for key, value in sorted(self._values.items())
+            ]
+
+    def exposition(self):
+        lines = [
+            '# HELP {} {}'.format(self.name, self.doc),
+            '# TYPE {} {}'.format(self.name, self.type_)
+        ]
+        for suffix, key, extra, value in self.samples():
+            lines.append('{}{}{} {}'.format(
+                self.name, suffix,
+                _format_labels(self.label_names, key, extra),
+                _format_value(value)
+            ))
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+
+    type_ = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+
+    type_ = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+
+    type_ = 'histogram'
+
+    def __init__(self, name, doc, labels=(), buckets=()):
+        super(Histogram, self).__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts, _, _ = state = self._values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, sum_, count) in sorted(self._values.items()):
+                acc = 0
+                for bound, n in zip(self.buckets, counts):
+                    acc += n
+                    samples.append(
+                        ('_bucket', key, (('le', _format_value(bound)),), acc)
+                    )
+                samples.append(('_sum', key, (), sum_))
+                samples.append(('_count', key, (), count))
+        return samples
+
+
+class Registry(object):
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, doc, labels=(), func=None):
+        return self.register(Counter(name, doc, labels, func))
+
+    def gauge(self, name, doc, labels=(), func=None):
+        return self.register(Gauge(name, doc, labels, func))
+
+    def histogram(self, name, doc, labels=(), buckets=()):
+        return self.register(Histogram(name, doc, labels, buckets))
+
+    def exposition(self):
+        '''
+        Returns:
+          metrics in Prometheus text format (version 0.0.4)
+        '''
+        return '\n'.join(m.exposition() for m in self.metrics) + '\n'
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import collections
+
+
+def _sizeof(value):
+    '''
+    approximate size (in bytes) of a value and its (flat) elements
+    '''
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+class DiskStore(object):
+    '''
+    persistent key-value store backed by sqlite3.
+    values must be JSON serializable.
+
+    Args:
+      path: sqlite3 file
+      commit_interval: the number of puts between commits
+      ttl: (optional) entries older than ttl seconds are ignored
+      max_entries: (optional) the oldest entries beyond max_entries are
+        deleted on commits
+
+    a process forked from the owner opens its own connection, because
+    sqlite3 connections must not be shared across fork.
+    '''
+
+    def __init__(self, path, commit_interval=100, ttl=None,
+                 max_entries=None):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._connect()
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(key TEXT PRIMARY KEY, value TEXT, created REAL)'
+        )
+        columns = [
+            row[1] for row in self._conn.execute('PRAGMA table_info(cache)')
+        ]
+        if 'created' not in columns:  # created by an older version
+            self._conn.execute(
+                'ALTER TABLE cache ADD COLUMN created REAL DEFAULT 0'
+            )
+        self._conn.commit()
+
+    def _connect(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA synchronous = OFF')
+        self._num_uncommitted = 0
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # (the connection of the parent is left as is)
+            self._connect()
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.sha1(repr(key)).hexdigest()
+
+    def get(self, key):
+        self._check_fork()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created FROM cache WHERE key = ?',
+                (self._hash(key),)
+            ).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and row[1] < time.time() - self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        self._check_fork()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, created) '
+                'VALUES (?, ?, ?)',
+                (self._hash(key), json.dumps(value), time.time())
+            )
+            self._num_uncommitted += 1
+            if self._num_uncommitted >= self.commit_interval:
+                self._commit()
+
+    def _commit(self):
+        if self.ttl is not None:
+            self._conn.execute(
+                'DELETE FROM cache WHERE created < ?',
+                (time.time() - self.ttl,)
+            )
+        if self.max_entries is not None:
+            self._conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY created DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+        self._conn.commit()
+        self._num_uncommitted = 0
+
+    def flush(self):
+        self._check_fork()
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+class LRUCache(object):
+    '''
+    thread-safe LRU cache bounded by the number of entries and
+    (optionally) by the approximate size of the values in bytes.
+
+    Args:
+      max_entries: the maximum number of entries
+      max_bytes: the maximum total size of values (None: unbounded)
+      sizeof: function that returns the size of a value in bytes
+      store: (optional) persistent store such as DiskStore.
+        it is read on misses and written on puts.
+      ttl: (optional) entries expire ttl seconds after they are put
+    '''
+
+    def __init__(self, max_entries=10000, max_bytes=None, sizeof=_sizeof,
+                 store=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.store = store
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (value, size, expiration time)
+        self._data = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def _insert(self, key, value):
+        size = self.sizeof(value)
+        if key in self._data:
+            self.nbytes -= self._data.pop(key)[1]
+        expires = None if self.ttl is None else time.time() + self.ttl
+        self._data[key] = (value, size, expires)
+        self.nbytes += size
+        while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self.nbytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._data.popitem(last=False)
+            self.nbytes -= evicted_size
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                item = self._data.pop(key)
+                if item[2] is not None and item[2] < time.time():
+                    self.nbytes -= item[1]
+                    self.expirations += 1
+                else:
+                    self._data[key] = item  # mark as recently used
+                    self.hits += 1
+                    return item[0]
+        if self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._insert(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._insert(key, value)
+        if self.store is not None:
+            self.store.put(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'expirations': self.expirations,
+                'entries': len(self._data), 'bytes': self.nbytes
+            }
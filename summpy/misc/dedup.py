@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import zlib
+import numpy
+
+
+_PRIME = (1 << 31) - 1  # hash values are in [0, _PRIME)
+
+
+def _token_hashes(tokens_list):
+    '''
+    Returns:
+      (hashes of distinct tokens, csr-like indptr and indices of the
+      distinct tokens of each sentence)
+    '''
+    vocab = {}
+    indptr, indices = [0], []
+    for tokens in tokens_list:
+        indices.extend(set(vocab.setdefault(t, len(vocab)) for t in tokens))
+        indptr.append(len(indices))
+    hashes = numpy.zeros(len(vocab), dtype=numpy.int64)
+    for t, i in vocab.iteritems():
+        hashes[i] = zlib.crc32(t.encode('utf-8')) & 0xffffffff
+    return (hashes % _PRIME, numpy.array(indptr, dtype=int),
+            numpy.array(indices, dtype=int))
+
+
+def minhash_signatures(tokens_list, num_perm=64, seed=0):
+    '''
+    MinHash signatures of token sets, i.e. for each of num_perm random
+    hash functions, the minimum hash value of the tokens of a sentence.
+    the fraction of equal values of two signatures estimates the Jaccard
+    similarity of the token sets.
+
+    Args:
+      tokens_list: list of list of tokens (e.g. of word_segmenter_ja)
+      num_perm: the number of hash functions
+      seed: random seed of the hash functions
+
+    Returns:
+      (N, num_perm) numpy.ndarray (rows of sentences without tokens are
+      _PRIME, i.e. larger than any hash value)
+    '''
+    hashes, indptr, indices = _token_hashes(tokens_list)
+    rand = numpy.random.RandomState(seed)
+    a = rand.randint(1, _PRIME, num_perm).astype(numpy.int64)
+    b = rand.randint(0, _PRIME, num_perm).astype(numpy.int64)
+    N = len(tokens_list)
+    signatures = numpy.full((N, num_perm), _PRIME, dtype=numpy.int64)
+    nonempty = numpy.flatnonzero(numpy.diff(indptr) > 0)
+    if len(nonempty) == 0:
+        return signatures
+    token_hashes = hashes[indices]
+    for k in range(num_perm):
+        # universal hashing (a * x + b) mod p (no overflow: a, x < 2 ** 31)
+        values = (a[k] * token_hashes + b[k]) % _PRIME
+        signatures[nonempty, k] = numpy.minimum.reduceat(
+            values, indptr[nonempty]
+        )
+    return signatures
+
+
+class _UnionFind(object):
+
+    def __init__(self, n):
+        self.parent = range(n)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        # the smaller index (the first occurrence) is the root
+        if i < j:
+            self.parent[j] = i
+        elif j < i:
+            self.parent[i] = j
+
+
+def near_duplicates(sentences, tokens_list, threshold=0.8, num_perm=64,
+                    bands=16, seed=0):
+    '''
+    group exact and near duplicate sentences.
+
+    exact duplicates (the same text except surrounding spaces) are found
+    by hashing. near duplicates are pairs of sentences whose Jaccard
+    similarity of token sets is at least threshold, estimated by MinHash.
+    candidate pairs are sentences with the same signature in one of the
+    bands (locality sensitive hashing), so that the cost is linear in
+    the number of sentences. lower threshold needs more bands to find
+    most of the pairs (a pair with similarity s is a candidate with
+    probability 1 - (1 - s ** (num_perm / bands)) ** bands).
+
+    Args:
+      sentences: list of sentences
+      tokens_list: list of tokens of each sentence
+      threshold: minimum (estimated) Jaccard similarity [0.0-1.0].
+        if it is 1.0 or more, only exact duplicates are grouped.
+      num_perm: the number of hash functions of MinHash
+      bands: the number of bands (num_perm must be divisible by it)
+      seed: random seed of the hash functions
+
+    Returns: tuple
+      (
+        numpy.ndarray of group index of each sentence (groups are numbered
+          in the order of their first sentences),
+        numpy.ndarray of the first sentence index of each group,
+        numpy.ndarray of the number of sentences in each group
+      )
+    '''
+    if num_perm % bands != 0:
+        raise ValueError('num_perm must be divisible by bands')
+    N = len(sentences)
+    uf = _UnionFind(N)
+
+    first = {}
+    for i, sent in enumerate(sentences):
+        uf.union(i, first.setdefault(sent.strip(), i))
+
+    if threshold < 1.0 and N > 1:
+        signatures = minhash_signatures(tokens_list, num_perm, seed)
+        rows = num_perm // bands
+        nonempty = [i for i in range(N) if len(tokens_list[i]) > 0]
+        for band in range(bands):
+            band_sigs = signatures[:, band * rows:(band + 1) * rows]
+            buckets = {}
+            for i in nonempty:
+                j = buckets.setdefault(band_sigs[i].tostring(), i)
+                if (j != i and uf.find(i) != uf.find(j)
+                        and (signatures[i] == signatures[j]).mean()
+                        >= threshold):
+                    uf.union(i, j)
+
+    roots = numpy.array([uf.find(i) for i in range(N)], dtype=int)
+    representatives, groups, counts = numpy.unique(
+        roots, return_inverse=True, return_counts=True
+    )
+    return groups, representatives, counts
@@ -1,28 +1,92 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import re
+import threading
 from janome.tokenizer import Tokenizer
 
 
-tokenizer = Tokenizer()
+# keyword arguments of janome Tokenizer (see configure)
+config = {}
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
 
 
-def is_stopword(n):  # <- mecab node
-    if len(n.surface) == 0:
-        return True
-    elif re.search(ur'^[\s!-@\[-`\{-~　、-〜！-＠［-｀]+$', n.surface):
-        return True
-    elif re.search(ur'^(接尾|非自立)', n.part_of_speech.split(',')[1]):
+def configure(udic='', udic_enc='utf8', udic_type='ipadic'):
+    '''
+    configure the tokenizer, which is created again on next use.
+
+    Args:
+      udic: user dictionary (CSV file, or directory of a dictionary
+        compiled by janome)
+      udic_enc: encoding of the CSV file
+      udic_type: 'ipadic' or 'simpledic' (see janome)
+    '''
+    global _tokenizer
+    with _tokenizer_lock:
+        config.clear()
+        config.update(udic=udic, udic_enc=udic_enc, udic_type=udic_type)
+        _tokenizer = None
+
+
+def get_tokenizer():
+    '''
+    janome Tokenizer, created on first use
+    (it takes seconds to load the dictionary)
+    '''
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = Tokenizer(**config)
+    return _tokenizer
+
+
+def warmup():
+    '''
+    load the dictionary now instead of on the first sentence
+    '''
+    get_tokenizer()
+
+
+_symbols_re = re.compile(ur'^[\s!-@\[-`\{-~　、-〜！-＠［-｀]+$')
+_stop_cat1_re = re.compile(ur'^(接尾|非自立)')
+_content_pos_re = re.compile(ur'^(名詞|動詞|形容詞)')
+
+
+def _is_stop_pos(part_of_speech, infl_form, base_form):
+    pos = part_of_speech.split(u',')
+    if _stop_cat1_re.search(pos[1] if len(pos) > 1 else u'*'):
         return True
-    elif u'サ変・スル' == n.infl_form or u'ある' == n.base_form:
+    elif u'サ変・スル' == infl_form or u'ある' == base_form:
         return True
-    elif re.search(ur'^(名詞|動詞|形容詞)', n.part_of_speech.split(',')[0]):
+    elif _content_pos_re.search(pos[0]):
         return False
     else:
         return True
 
 
+# (part_of_speech, infl_form, base_form == u'ある') -> is stopword
+# the number of keys is bounded by the POS tag set of the dictionary.
+_stop_pos_table = {}
+
+
+def is_stopword(n):  # <- janome token node
+    if len(n.surface) == 0:
+        return True
+    elif _symbols_re.search(n.surface):
+        return True
+    key = (n.part_of_speech, n.infl_form, n.base_form == u'ある')
+    try:
+        return _stop_pos_table[key]
+    except KeyError:
+        is_stop = _stop_pos_table[key] = _is_stop_pos(
+            n.part_of_speech, n.infl_form, n.base_form
+        )
+        return is_stop
+
+
 def not_stopword(n):
     return not is_stopword(n)
 
@@ -49,7 +113,7 @@ def _decode_janome_token(t, encoding='utf-8'):
 
 def word_segmenter_ja(sent, node_filter=not_stopword,
                       node2word=node2norm_word):
-    nodes = (_decode_janome_token(t) for t in tokenizer.tokenize(sent))
+    nodes = (_decode_janome_token(t) for t in get_tokenizer().tokenize(sent))
 
     if node_filter:
         nodes = [n for n in nodes if node_filter(n)]
@@ -58,6 +122,13 @@ def word_segmenter_ja(sent, node_filter=not_stopword,
     return words
 
 
+configure(
+    udic=os.environ.get('SUMMPY_JANOME_USER_DICT', ''),
+    udic_enc=os.environ.get('SUMMPY_JANOME_USER_DICT_ENC', 'utf8'),
+    udic_type=os.environ.get('SUMMPY_JANOME_USER_DICT_TYPE', 'ipadic')
+)
+
+
 if __name__ == '__main__':
     text = u'今日はいい天気ですね。'
     print '|'.join(word_segmenter_ja(text)).encode('utf-8')
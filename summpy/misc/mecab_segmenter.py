@@ -1,14 +1,65 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import re
+import threading
 import MeCab
 
 
-_mecab = MeCab.Tagger()
+# MeCab.Tagger for fast mode (one line per token: surface and features)
+_FAST_TAGGER_ARGS = (
+    '--node-format=%m\\t%H\\n --unk-format=%m\\t%H\\n --eos-format=EOS\\n'
+)
+# options of MeCab.Tagger (see configure)
+config = {}
+# args -> MeCab.Tagger, created on first use
+_taggers = {}
+_taggers_lock = threading.Lock()
+
+
+def configure(args=''):
+    '''
+    configure the taggers, which are created again on next use.
+
+    Args:
+      args: options of MeCab, e.g. '-d <dicdir> -u <user.dic>'.
+        MeCab maps (compiled) dictionaries into memory with mmap, so that
+        processes on a host share a copy of them.
+    '''
+    with _taggers_lock:
+        config.clear()
+        config.update(args=args)
+        _taggers.clear()
+
+
+def _get_tagger(args=''):
+    args = ' '.join(a for a in (config['args'], args) if a)
+    tagger = _taggers.get(args)
+    if tagger is None:
+        with _taggers_lock:
+            tagger = _taggers.get(args)
+            if tagger is None:
+                tagger = _taggers[args] = MeCab.Tagger(args)
+    return tagger
+
+
+def warmup():
+    '''
+    create the taggers (and load the dictionary) now instead of on the
+    first sentence
+    '''
+    _get_tagger()
+    _get_tagger(_FAST_TAGGER_ARGS)
+
+
 # 品詞,品詞細分類1,品詞細分類2,品詞細分類3,活用形,活用型,原形,読み,発音
 _mecab_feat_labels = 'pos cat1 cat2 cat3 conj conj_t orig read pron'.split(' ')
 
+_symbols_re = re.compile(ur'^[\s!-@\[-`\{-~　、-〜！-＠［-｀]+$')
+_stop_cat1_re = re.compile(ur'^(接尾|非自立)')
+_content_pos_re = re.compile(ur'^(名詞|動詞|形容詞)')
+
 
 def _mecab_parse_feat(feat):
     return dict(zip(_mecab_feat_labels, feat.split(',')))
@@ -28,21 +79,48 @@ def _mecab_node2seq(node, decode_surface=True, feat_dict=True,
         node = node.next
 
 
-def is_stopword(n):  # <- mecab node
-    if len(n._surface) == 0:
-        return True
-    elif re.search(ur'^[\s!-@\[-`\{-~　、-〜！-＠［-｀]+$', n._surface):
-        return True
-    elif re.search(ur'^(接尾|非自立)', n.feat_dict['cat1']):
+def _is_stop_pos(pos, cat1, conj, orig):
+    if _stop_cat1_re.search(cat1):
         return True
-    elif u'サ変・スル' == n.feat_dict['conj'] or u'ある' == n.feat_dict['orig']:
+    elif u'サ変・スル' == conj or u'ある' == orig:
         return True
-    elif re.search(ur'^(名詞|動詞|形容詞)', n.feat_dict['pos']):
+    elif _content_pos_re.search(pos):
         return False
     else:
         return True
 
 
+# (pos, cat1, conj, orig == u'ある') -> is stopword
+# the number of keys is bounded by the POS tag set of the dictionary.
+_stop_pos_table = {}
+
+
+def _is_stop_feat(surface, feat):
+    if len(surface) == 0 or _symbols_re.search(surface):
+        return True
+    pos = feat[0]
+    cat1 = feat[1] if len(feat) > 1 else u'*'
+    conj = feat[4] if len(feat) > 4 else u'*'
+    orig = feat[6] if len(feat) > 6 else u'*'
+    key = (pos, cat1, conj, orig == u'ある')
+    try:
+        return _stop_pos_table[key]
+    except KeyError:
+        is_stop = _stop_pos_table[key] = _is_stop_pos(pos, cat1, conj, orig)
+        return is_stop
+
+
+def is_stopword(n):  # <- mecab node
+    if len(n._surface) == 0:
+        return True
+    elif _symbols_re.search(n._surface):
+        return True
+    return _is_stop_pos(
+        n.feat_dict['pos'], n.feat_dict['cat1'],
+        n.feat_dict['conj'], n.feat_dict['orig']
+    )
+
+
 def not_stopword(n):  # <- mecab node
     return not is_stopword(n)
 
@@ -51,6 +129,9 @@ def node2word(n):  # <- mecab node
     return n._surface
 
 
+_node2surface = node2word  # shadowed by the argument of word_segmenter_ja
+
+
 def node2norm_word(n):  # mecab node
     if n.feat_dict['orig'] != '*':
         return n.feat_dict['orig']
@@ -58,13 +139,53 @@ def node2norm_word(n):  # mecab node
         return n._surface
 
 
+def _fast_word_segmenter_ja(sent, norm=True, mecab_encoding='utf-8'):
+    '''
+    same as word_segmenter_ja(sent, not_stopword, node2norm_word) (or
+    node2word if norm is False) but parses the whole output of MeCab at once
+    instead of building a feature dict for each node.
+    '''
+    words = []
+    output = _get_tagger(_FAST_TAGGER_ARGS).parse(sent)
+    for line in output.decode(mecab_encoding).split(u'\n'):
+        if line == u'EOS':
+            break
+        surface, _, feature = line.partition(u'\t')
+        feat = feature.split(u',')
+        if _is_stop_feat(surface, feat):
+            continue
+        if norm and len(feat) > 6 and feat[6] != u'*':
+            words.append(feat[6])
+        else:
+            words.append(surface)
+    return words
+
+
 def word_segmenter_ja(sent, node_filter=not_stopword,
-                      node2word=node2norm_word, mecab_encoding='utf-8'):
+                      node2word=node2norm_word, mecab_encoding='utf-8',
+                      fast=True):
+    '''
+    Args:
+      sent: sentence (unicode or mecab_encoding encoded string)
+      node_filter: function that returns True if a MeCab node is a word
+      node2word: function that converts a MeCab node to a word
+      fast: if True, the default node_filter and node2word are applied
+        without building MeCab nodes (see _fast_word_segmenter_ja).
+        custom functions always use the node-based path.
+    '''
     if type(sent) == unicode:
         sent = sent.encode(mecab_encoding)
 
+    if fast and node_filter is not_stopword and node2word in (
+            node2norm_word, _node2surface):
+        return _fast_word_segmenter_ja(
+            sent, norm=node2word is node2norm_word,
+            mecab_encoding=mecab_encoding
+        )
+
     nodes = list(
-        _mecab_node2seq(_mecab.parseToNode(sent), mecab_encoding=mecab_encoding)
+        _mecab_node2seq(_get_tagger().parseToNode(sent),
+                        mecab_encoding=mecab_encoding)
     )
     if node_filter:
         nodes = [n for n in nodes if node_filter(n)]
@@ -73,6 +194,9 @@ def word_segmenter_ja(sent, node_filter=not_stopword,
     return words
 
 
+configure(args=os.environ.get('SUMMPY_MECAB_ARGS', ''))
+
+
 if __name__ == '__main__':
     text = u'今日はいい天気ですね。'
     print '|'.join(word_segmenter_ja(text)).encode('utf-8')
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+import scipy.sparse
+
+try:  # sparse matrix-vector product into a preallocated vector
+    from scipy.sparse._sparsetools import csr_matvec as _csr_matvec
+except ImportError:
+    _csr_matvec = None
+
+
+class ConvergenceError(Exception):
+    pass
+
+
+# adaptive_tol stops when the order of the top nodes has not changed
+# and cannot change in the remaining iterations
+_STABLE_TOP = 50
+_STABLE_ITERATIONS = 10
+_TIE = 1.0e-9  # relative difference of scores regarded as a tie
+
+
+def _top_order(x, k):
+    '''
+    indices of the k largest values of x in descending order
+    '''
+    if k < len(x):
+        top = numpy.argpartition(-x, k)[:k]
+    else:
+        top = numpy.arange(len(x))
+    return top[numpy.argsort(-x[top], kind='mergesort')]
+
+
+def _order_settled(top_scores, change, err, err_last):
+    '''
+    True if the gaps between the descending top_scores are larger than
+    the change of a score expected in the remaining iterations, which is
+    extrapolated from the last change (the largest change of a score)
+    by the rate of the errors assuming geometric convergence.
+    '''
+    if err_last is None or err >= err_last:
+        return False
+    rate = err / err_last
+    remaining = change * rate / (1.0 - rate)
+    gaps = top_scores[:-1] - top_scores[1:]
+    # (ties, e.g. of duplicate sentences, do not change the selection)
+    gaps = gaps[gaps > _TIE * top_scores[0]]
+    return len(gaps) == 0 or gaps.min() > 2.0 * remaining
+
+
+def _matvec(A, x, out):
+    '''
+    out[:] = A * x without allocating a new vector
+    (A: csr_matrix, x and out: arrays of the dtype of A)
+    '''
+    if _csr_matvec is None:
+        out[:] = A.dot(x)
+    else:
+        out.fill(0)
+        _csr_matvec(A.shape[0], A.shape[1], A.indptr, A.indices, A.data, x,
+                    out)
+    return out
+
+
+def _normalized(v, N, name, dtype=float):
+    '''
+    returns v (array-like of length N) normalized to sum to 1,
+    or the uniform vector if v is None.
+    '''
+    if v is None:
+        return numpy.repeat(numpy.array(1.0 / N, dtype=dtype), N)
+    v = numpy.asarray(v, dtype=dtype).ravel()
+    if v.shape[0] != N:
+        raise ValueError(
+            '%s vector must have a value for every node '
+            '(expected %d, got %d)' % (name, N, v.shape[0])
+        )
+    s = v.sum()
+    if s <= 0:
+        raise ValueError('%s vector must have a positive sum' % name)
+    return v / s
+
+
+def _stochastic(adj, dtype=float):
+    '''
+    returns (right) stochastic form of adj and a boolean mask of
+    dangling (no out-link) nodes.
+    '''
+    M = scipy.sparse.csr_matrix(adj, dtype=dtype)
+    S = numpy.asarray(M.sum(axis=1)).ravel()
+    is_dangling = S == 0
+    S[~is_dangling] = 1.0 / S[~is_dangling]
+    M = scipy.sparse.diags(S, 0, format='csr') * M
+    return M, is_dangling
+
+
+def pagerank_matrix(adj, alpha=0.85, personalization=None, max_iter=100,
+                    tol=1.0e-6, nstart=None, dangling=None,
+                    return_n_iter=False, deadline=None, dtype=float):
+    '''
+    Returns the PageRank of the nodes of a graph given as an adjacency matrix.
+    This code is based on networkx.pagerank_scipy.
+
+    Args:
+      adj: (N, N) weighted adjacency matrix (scipy.sparse, csr preferred)
+      alpha: the damping factor
+      personalization: array of length N (uniform if None)
+      max_iter: maximum number of power iterations
+      tol: error tolerance used to check convergence (l1 norm / N)
+      nstart: starting vector of length N (warm start, uniform if None)
+      dangling: array of length N, the out-link weights of dangling nodes
+        (personalization is used if None)
+      return_n_iter: if True, also returns the number of iterations
+      deadline: (optional) deadline.Deadline checked in every iteration
+      dtype: dtype of the matrix and vectors, e.g. numpy.float32 to halve
+        the memory (the order of scores is mostly the same, see
+        benchmark.py)
+
+    Returns:
+      numpy.ndarray of scores (and the number of iterations if return_n_iter)
+    '''
+    N = adj.shape[0]
+    if N == 0:
+        x = numpy.zeros(0, dtype=dtype)
+        return (x, 0) if return_n_iter else x
+
+    M, is_dangling = _stochastic(adj, dtype)
+    MT = M.T.tocsr()
+
+    x = _normalized(nstart, N, 'nstart', dtype)
+    p = _normalized(personalization, N, 'personalization', dtype)
+    if dangling is None:
+        dangling_weights = p
+    else:
+        dangling_weights = _normalized(dangling, N, 'dangling', dtype)
+
+    # power iteration: make up to max_iter iterations
+    for n_iter in range(1, max_iter + 1):
+        if deadline is not None:
+            deadline.check('pagerank_matrix')
+        xlast = x
+        x = (
+            alpha * (MT.dot(x) + x[is_dangling].sum() * dangling_weights)
+            + (1.0 - alpha) * p
+        )
+        # check convergence, l1 norm
+        err = numpy.absolute(x - xlast).sum()
+        if err < N * tol:
+            return (x, n_iter) if return_n_iter else x
+
+    raise ConvergenceError('pagerank_matrix: power iteration failed to '
+                           'converge in %d iterations.' % max_iter)
+
+
+def divrank_matrix(adj, alpha=0.25, d=0.85, personalization=None,
+                   max_iter=100, tol=1.0e-6, nstart=None, dangling=None,
+                   return_n_iter=False, deadline=None, adaptive_tol=False,
+                   dtype=float):
+    '''
+    Returns the DivRank (Diverse Rank) of the nodes of a graph given as an
+    adjacency matrix. This code is based on divrank.divrank_scipy.
+
+    Args: (diff from pagerank_matrix)
+      alpha: controls strength of self-link [0.0-1.0]
+      d: the damping factor
+      nstart: starting vector, e.g. scores of a similar graph (warm start)
+      adaptive_tol: if True, also stop when the order of the top nodes
+        by score has not changed in the last iterations and their gaps
+        are larger than the expected change of scores until convergence,
+        which is all that sentence selection needs (the scores are less
+        accurate)
+
+    Returns:
+      numpy.ndarray of scores (and the number of iterations if return_n_iter)
+
+    Unlike divrank_scipy, a dangling node links to the dangling weights
+    (with strength alpha) in addition to its self-link, so that the
+    iteration conserves the total score and converges on graphs with
+    isolated nodes. The scores are the same for graphs without dangling
+    nodes.
+    '''
+    N = adj.shape[0]
+    if N == 0:
+        x = numpy.zeros(0, dtype=dtype)
+        return (x, 0) if return_n_iter else x
+
+    M, is_dangling = _stochastic(adj, dtype)
+
+    # self-link (DivRank): the transition matrix is
+    # alpha * M (without diagonal) + (1 - alpha) * I, and only the first
+    # term is stored (the diagonal is removed in O(nnz))
+    rows = numpy.repeat(numpy.arange(N), numpy.diff(M.indptr))
+    M.data[rows == M.indices] = 0.0
+    M.data *= alpha
+    M.eliminate_zeros()
+    MT = M.T.tocsr()
+    dangling_nodes = numpy.flatnonzero(is_dangling)
+
+    x = _normalized(nstart, N, 'nstart', dtype).copy()
+    p = _normalized(personalization, N, 'personalization', dtype)
+    if dangling is None:
+        dangling_weights = p
+    else:
+        dangling_weights = _normalized(dangling, N, 'dangling', dtype)
+    teleport = (1.0 - d) * p
+
+    # buffers of the iteration
+    D_t = numpy.empty(N, dtype=dtype)
+    y = numpy.empty(N, dtype=dtype)
+    x_next = numpy.empty(N, dtype=dtype)
+    order, stable, err_last = None, 0, None
+
+    # power iteration: make up to max_iter iterations
+    for n_iter in range(1, max_iter + 1):
+        if deadline is not None:
+            deadline.check('divrank_matrix')
+        # D_t = M' * x (M': the transition matrix with self-links)
+        _matvec(M, x, D_t)
+        D_t += numpy.multiply(x, 1.0 - alpha, out=y)
+        if len(dangling_nodes) > 0:
+            D_t[dangling_nodes] += alpha * dangling_weights.dot(x)
+        # x_next = d * (M'^T * (x / D_t) + dangling flow) * x + teleport
+        numpy.divide(x, D_t, out=y)
+        dangling_flow = alpha * y[dangling_nodes].sum()
+        _matvec(MT, y, x_next)
+        x_next += numpy.multiply(y, 1.0 - alpha, out=D_t)
+        if dangling_flow != 0.0:
+            x_next += numpy.multiply(dangling_weights, dangling_flow, out=D_t)
+        x_next *= x
+        x_next *= d
+        x_next += teleport
+        # check convergence, l1 norm
+        numpy.absolute(numpy.subtract(x_next, x, out=y), out=y)
+        err = y.sum()
+        x, x_next = x_next, x
+        if err < N * tol:
+            return (x, n_iter) if return_n_iter else x
+        if adaptive_tol:
+            order_last, order = order, _top_order(x, _STABLE_TOP + 1)
+            if (order_last is not None and numpy.array_equal(order, order_last)
+                    and _order_settled(x[order], y.max(), err, err_last)):
+                stable += 1
+                if stable >= _STABLE_ITERATIONS:
+                    return (x, n_iter) if return_n_iter else x
+            else:
+                stable = 0
+        err_last = err
+
+    raise ConvergenceError('divrank_matrix: power iteration failed to '
+                           'converge in %d iterations.' % max_iter)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy
+import scipy.sparse
+
+
+def tf_matrix(tf_list, dtype=float):
+    '''
+    same as sklearn's DictVectorizer(sparse=True).fit_transform(tf_list)
+    without importing sklearn (columns are sorted features)
+
+    Args:
+      tf_list: list of dict of word -> frequency
+      dtype: dtype of values (indices are int32 unless they overflow)
+
+    Returns:
+      (N, V) scipy.sparse.csr_matrix
+    '''
+    vocab = sorted(set(w for tf in tf_list for w in tf))
+    word2col = dict((w, i) for i, w in enumerate(vocab))
+    indptr, cols, values = [0], [], []
+    for tf in tf_list:
+        for w, v in tf.iteritems():
+            cols.append(word2col[w])
+            values.append(v)
+        indptr.append(len(cols))
+    X = scipy.sparse.csr_matrix(
+        (numpy.array(values, dtype=dtype), numpy.array(cols, dtype=int),
+         numpy.array(indptr, dtype=int)),
+        shape=(len(tf_list), len(vocab))
+    )
+    X.sort_indices()
+    return X
+
+
+def _l2_normalized(X):
+    '''
+    rows of X (scipy.sparse.csr_matrix) scaled to unit l2 norm
+    (zero rows are left as they are)
+    '''
+    norms = numpy.sqrt(numpy.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return scipy.sparse.diags(1.0 / norms, 0, format='csr') * X
+
+
+def _top_k_mask(rows, data, k):
+    '''
+    returns a boolean mask which keeps (at most) k largest values per row.
+    rows must be sorted in ascending order.
+    '''
+    order = numpy.lexsort((-data, rows))
+    rows_sorted = rows[order]
+    # rank of each entry within its row
+    starts = numpy.searchsorted(rows_sorted, rows_sorted, side='left')
+    rank = numpy.arange(len(rows_sorted)) - starts
+    mask = numpy.zeros(len(rows), dtype=bool)
+    mask[order[rank < k]] = True
+    return mask
+
+
+def cosine_similarity_matrix(vecs, dtype=float):
+    '''
+    Returns:
+      dense (N, N) numpy.ndarray of cosine similarities of row vectors
+      (the same as 1 - pairwise_distances(vecs, metric='cosine') except
+      for zero vectors)
+    '''
+    X = _l2_normalized(scipy.sparse.csr_matrix(vecs, dtype=dtype))
+    return (X * X.T).toarray()
+
+
+def _at_least(sims, sim_threshold):
+    '''
+    sims >= sim_threshold as 1 - pairwise_distances(metric='cosine') was
+    compared, i.e. similarities rounded through cosine distances (e.g. a
+    similarity of exactly 0.1 is rounded below 0.1), so that pairs at the
+    threshold are linked as before.
+    '''
+    return 1.0 - (1.0 - sims) >= sim_threshold
+
+
+def _links(rows, cols, sims, sim_threshold, continuous, top_k):
+    '''
+    returns the pairs (rows, cols, sims) linked by cosine_similarity_graph.
+    all the pairs of a row must be given at once for top_k.
+    '''
+    if continuous:
+        keep = sims > 0
+    else:
+        keep = _at_least(sims, sim_threshold)
+    keep &= rows != cols
+    rows, cols, sims = rows[keep], cols[keep], sims[keep]
+
+    if top_k is not None and len(rows) > 0:
+        order = numpy.argsort(rows, kind='mergesort')
+        rows, cols, sims = rows[order], cols[order], sims[order]
+        keep = _top_k_mask(rows, sims, top_k)
+        rows, cols, sims = rows[keep], cols[keep], sims[keep]
+    return rows, cols, sims
+
+
+def cosine_similarity_graph(vecs, sim_threshold=0.1, continuous=False,
+                            top_k=None, block_size=1024, dtype=float,
+                            return_similarity=True):
+    '''
+    build a sparse similarity graph of row vectors without allocating
+    the dense N x N similarity matrix.
+
+    Args:
+      vecs: (N, V) matrix (scipy.sparse or numpy.ndarray) of sentence vectors
+      sim_threshold: link i and j if cosine(i, j) >= sim_threshold.
+        if continuous is True, link every pair with cosine(i, j) > 0.
+      continuous: if True, edges are weighted by similarity,
+        otherwise every edge has weight 1.0
+      top_k: if given, keep at most top_k most similar neighbours per row
+      block_size: the number of rows multiplied at once.
+        peak memory is proportional to block_size * N in the worst case.
+      dtype: dtype of vectors and similarities, e.g. numpy.float32 to
+        halve the memory (scipy uses int32 indices unless they overflow)
+      return_similarity: if False, the similarity matrix is not built
+        (None is returned instead)
+
+    Returns: tuple
+      (
+        adjacency matrix (N x N scipy.sparse.csr_matrix, no self-links),
+        similarity matrix (N x N scipy.sparse.csr_matrix, linked pairs only)
+      )
+    '''
+    X = _l2_normalized(scipy.sparse.csr_matrix(vecs, dtype=dtype))
+    XT = X.T.tocsc()
+    N = X.shape[0]
+
+    rows_list, cols_list, sims_list = [], [], []
+    for start in range(0, N, block_size):
+        end = min(start + block_size, N)
+        block = (X[start:end] * XT).tocoo()
+        rows, cols, sims = _links(
+            block.row + start, block.col, block.data, sim_threshold,
+            continuous, top_k
+        )
+        rows_list.append(rows)
+        cols_list.append(cols)
+        sims_list.append(sims)
+
+    return _graph(rows_list, cols_list, sims_list, N, continuous, dtype,
+                  return_similarity)
+
+
+def _graph(rows_list, cols_list, sims_list, N, continuous, dtype,
+           return_similarity):
+    '''
+    returns adjacency and similarity matrices of cosine_similarity_graph
+    from blocks of edges
+    '''
+    if len(rows_list) > 0:
+        rows = numpy.concatenate(rows_list)
+        cols = numpy.concatenate(cols_list)
+        sims = numpy.concatenate(sims_list)
+    else:
+        rows = cols = numpy.array([], dtype=numpy.int32)
+        sims = numpy.array([], dtype=dtype)
+
+    if continuous or return_similarity:
+        sim_mat = scipy.sparse.csr_matrix(
+            (sims, (rows, cols)), shape=(N, N)
+        )
+    else:
+        sim_mat = None
+    if continuous:
+        adj = sim_mat.copy() if return_similarity else sim_mat
+    else:
+        adj = scipy.sparse.csr_matrix(
+            (numpy.ones(len(rows), dtype=dtype), (rows, cols)), shape=(N, N)
+        )
+    return adj, sim_mat if return_similarity else None
+
+
+def lsh_similarity_graph(vecs, sim_threshold=0.1, continuous=False,
+                         top_k=None, n_tables=16, n_bits=8, seed=0,
+                         block_size=256, dtype=float, return_similarity=True):
+    '''
+    approximate cosine_similarity_graph for very long documents.
+    candidate pairs are found by random projection LSH, i.e. sentences
+    on the same side of n_bits random hyperplanes in any of n_tables
+    tables, and only the similarities within these buckets are computed.
+    a pair with cosine similarity s (angle theta = arccos(s)) is a
+    candidate with probability 1 - (1 - (1 - theta / pi) ** n_bits) **
+    n_tables, e.g. 0.8 for s = 0.7 and 0.47 for s = 0.5 with the default
+    parameters, while pairs of low similarity (e.g. s = 0.1) are mostly
+    missed. benchmark.py measures the recall.
+
+    Args: (diff from cosine_similarity_graph)
+      n_tables: the number of hash tables.
+        more tables find more pairs (recall) in proportional time.
+      n_bits: the number of hyperplanes of a table.
+        fewer bits find more pairs, but in larger buckets (the cost is
+        quadratic in the bucket size).
+      seed: random seed of the hyperplanes
+      block_size: the number of sentences (of whole buckets) whose
+        similarities are computed at once
+
+    Returns:
+      the same as cosine_similarity_graph (without the pairs not found)
+    '''
+    X = _l2_normalized(scipy.sparse.csr_matrix(vecs, dtype=dtype))
+    N, V = X.shape
+    # (zero vectors are not similar to any vector)
+    ids = numpy.flatnonzero(numpy.diff(X.indptr) > 0)
+    X_ids = X[ids]
+    rand = numpy.random.RandomState(seed)
+    weights = 1 << numpy.arange(n_bits, dtype=numpy.int64)
+
+    keys_list = []
+    for _ in range(n_tables):
+        hyperplanes = rand.randn(V, n_bits).astype(dtype)
+        codes = (X_ids * hyperplanes > 0).dot(weights)
+        order = numpy.argsort(codes, kind='mergesort')
+        codes, X_sorted = codes[order], X_ids[order]
+        # chunks of whole buckets of about block_size sentences
+        bounds = numpy.append(numpy.flatnonzero(numpy.diff(codes)) + 1,
+                              len(codes))
+        start = 0
+        for end in bounds:
+            if end - start < block_size and end != len(codes):
+                continue
+            X_chunk = X_sorted[start:end]
+            block = (X_chunk * X_chunk.T).tocoo()
+            rows, cols, sims = block.row, block.col, block.data
+            if continuous:
+                keep = sims > 0
+            else:
+                keep = _at_least(sims, sim_threshold)
+            keep &= rows < cols
+            rows, cols = rows[keep] + start, cols[keep] + start
+            keep = codes[rows] == codes[cols]
+            rows, cols = ids[order[rows[keep]]], ids[order[cols[keep]]]
+            keys_list.append(
+                numpy.minimum(rows, cols).astype(numpy.int64) * N
+                + numpy.maximum(rows, cols)
+            )
+            start = end
+
+    # pairs found in some tables (similarities are symmetric)
+    if len(keys_list) > 0:
+        keys = numpy.unique(numpy.concatenate(keys_list))
+    else:
+        keys = numpy.array([], dtype=numpy.int64)
+    del keys_list
+    rows, cols = keys // N, keys % N
+    sims = numpy.asarray(
+        X[rows].multiply(X[cols]).sum(axis=1), dtype=dtype
+    ).ravel()
+    rows, cols, sims = _links(
+        numpy.concatenate([rows, cols]), numpy.concatenate([cols, rows]),
+        numpy.concatenate([sims, sims]), sim_threshold, continuous, top_k
+    )
+    return _graph([rows], [cols], [sims], N, continuous, dtype,
+                  return_similarity)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import math
+import collections
+
+
+class ParamError(ValueError):
+    '''
+    invalid parameters.
+
+    Attributes:
+      errors: list of {'param': name, 'message': ..., 'value': ...}
+    '''
+
+    def __init__(self, errors):
+        self.errors = errors
+        super(ParamError, self).__init__('; '.join(
+            '{}: {}'.format(e['param'], e['message']) for e in errors
+        ))
+
+
+_int_re = re.compile(r'^[+-]?\d+$')
+_float_re = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+_booleans = {
+    'true': True, '1': True, 'yes': True,
+    'false': False, '0': False, 'no': False
+}
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, (int, long)):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, basestring) and _int_re.match(value.strip()):
+        return int(value)
+    raise ValueError
+
+
+def _to_float(value):
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, (int, long, float)):
+        return float(value)
+    if isinstance(value, basestring) and _float_re.match(value.strip()):
+        return float(value)
+    raise ValueError
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, basestring) and value.lower() in _booleans:
+        return _booleans[value.lower()]
+    raise ValueError
+
+
+def _to_str(value):
+    if isinstance(value, basestring):
+        return str(value)
+    raise ValueError
+
+
+_converters = {
+    'int': _to_int, 'float': _to_float, 'bool': _to_bool, 'str': _to_str
+}
+
+
+class Param(object):
+    '''
+    declaration of a summarizer parameter.
+
+    Args:
+      name: keyword argument name of the summarizer
+      type_: 'int', 'float', 'bool' or 'str'
+      default: default value of the summarizer (for introspection)
+      min_value, max_value: (int, float) allowed range (inclusive)
+      choices: (str) allowed values
+      required: if True, the parameter must be given
+      description: description of the parameter
+    '''
+
+    def __init__(self, name, type_, default=None, min_value=None,
+                 max_value=None, choices=None, required=False,
+                 description=''):
+        self.name = name
+        self.type_ = type_
+        self.convert = _converters[type_]
+        self.default = default
+        self.min_value = min_value
+        self.max_value = max_value
+        self.choices = choices
+        self.required = required
+        self.description = description
+
+    def _expected(self):
+        if self.choices is not None:
+            return 'one of {}'.format(', '.join(self.choices))
+        expected = {
+            'int': 'an integer', 'float': 'a number', 'bool': 'true or false',
+            'str': 'a string'
+        }[self.type_]
+        if self.min_value is not None and self.max_value is not None:
+            expected += ' in [{}, {}]'.format(self.min_value, self.max_value)
+        elif self.min_value is not None:
+            expected += ' >= {}'.format(self.min_value)
+        elif self.max_value is not None:
+            expected += ' <= {}'.format(self.max_value)
+        return expected
+
+    def parse(self, value):
+        '''
+        convert a value (string of a form, or JSON value) to the type
+
+        Raises:
+          ValueError with a message for the client
+        '''
+        try:
+            value = self.convert(value)
+        except (ValueError, TypeError, OverflowError):
+            raise ValueError('must be ' + self._expected())
+        # (JSON may have NaN and Infinity, which are not in any range)
+        if self.type_ == 'float' and (math.isnan(value)
+                                      or math.isinf(value)):
+            raise ValueError('must be ' + self._expected())
+        if (self.choices is not None and value not in self.choices
+                or self.min_value is not None and value < self.min_value
+                or self.max_value is not None and value > self.max_value):
+            raise ValueError('must be ' + self._expected())
+        return value
+
+    def describe(self):
+        desc = {'type': self.type_, 'description': self.description}
+        if self.default is not None:
+            desc['default'] = self.default
+        if self.min_value is not None:
+            desc['min'] = self.min_value
+        if self.max_value is not None:
+            desc['max'] = self.max_value
+        if self.choices is not None:
+            desc['choices'] = list(self.choices)
+        if self.required:
+            desc['required'] = True
+        return desc
+
+
+class Schema(object):
+    '''
+    parameters of an algorithm
+    '''
+
+    def __init__(self, description, params):
+        self.description = description
+        self.params = collections.OrderedDict((p.name, p) for p in params)
+
+    def validate(self, params):
+        '''
+        Args:
+          params: dict of name -> value (string or JSON value)
+
+        Returns:
+          dict of name -> converted value
+
+        Raises:
+          ParamError with all the errors
+        '''
+        validated, errors = {}, []
+        for name, value in params.iteritems():
+            param = self.params.get(name)
+            if param is None:
+                errors.append({
+                    'param': name, 'message': 'unknown parameter',
+                    'value': value
+                })
+                continue
+            try:
+                validated[name] = param.parse(value)
+            except ValueError, e:
+                errors.append({
+                    'param': name, 'message': str(e), 'value': value
+                })
+        for param in self.params.itervalues():
+            if param.required and param.name not in params:
+                errors.append({'param': param.name, 'message': 'required'})
+        if len(errors) > 0:
+            raise ParamError(errors)
+        return validated
+
+    def describe(self):
+        return {
+            'description': self.description,
+            'params': collections.OrderedDict(
+                (name, p.describe()) for name, p in self.params.iteritems()
+            )
+        }
+
+
+_debug = Param('debug', 'bool', default=False,
+               description='return debug_info (e.g. profile of stages)')
+
+_lexrank_params = [
+    Param('sent_limit', 'int', min_value=1,
+          description='summary length (the number of sentences)'),
+    Param('char_limit', 'int', min_value=1,
+          description='summary length (the number of characters)'),
+    Param('imp_require', 'float', min_value=0.0, max_value=1.0,
+          description='cumulative score of the summary'),
+    _debug,
+    Param('sim_threshold', 'float', default=0.1, min_value=0.0,
+          max_value=1.0,
+          description='link sentences whose similarity is at least this'),
+    Param('alpha', 'float', default=0.9, min_value=0.0, max_value=1.0,
+          description='the damping factor'),
+    Param('top_k', 'int', min_value=1,
+          description='link each sentence to at most top_k sentences'),
+    Param('block_size', 'int', default=1024, min_value=1, max_value=65536,
+          description='sentences whose similarities are computed at once'),
+    Param('backend', 'str', default='matrix', choices=('matrix', 'networkx'),
+          description='implementation of ranking'),
+    Param('dtype', 'str', default='float64', choices=('float64', 'float32'),
+          description='precision of similarities and ranking'),
+    Param('dedup_threshold', 'float', min_value=0.0, max_value=1.0,
+          description='merge sentences whose similarity of words (Jaccard)'
+                      ' is at least this before ranking (1.0: exact only)'),
+    Param('dedup_prior', 'bool', default=True,
+          description='weight merged sentences by their number'),
+    Param('lsh_tables', 'int', min_value=1, max_value=256,
+          description='find similar sentences approximately with this many'
+                      ' LSH tables (faster for very long documents)'),
+    Param('lsh_bits', 'int', default=8, min_value=1, max_value=30,
+          description='random hyperplanes of an LSH table (fewer bits find'
+                      ' more pairs in more time)'),
+]
+
+SCHEMAS = collections.OrderedDict([
+    ('lexrank', Schema('LexRank, a graph-based summarization',
+                       _lexrank_params)),
+    ('clexrank', Schema('Continuous LexRank', _lexrank_params)),
+    ('divrank', Schema(
+        'DivRank (Diverse Rank), LexRank with less redundancy',
+        _lexrank_params + [
+            Param('divrank_alpha', 'float', default=0.25, min_value=0.0,
+                  max_value=1.0, description='strength of self-link'),
+        ]
+    )),
+    ('mcp', Schema(
+        'sentence extraction in terms of maximum coverage problem',
+        [
+            Param('char_limit', 'int', min_value=1, required=True,
+                  description='summary length (the number of characters)'),
+            _debug,
+            Param('solver', 'str', default='ilp',
+                  choices=('ilp', 'greedy', 'local_search'),
+                  description='exact (ilp) or approximate solver'),
+            Param('time_limit', 'float', min_value=0.0,
+                  description='(ilp) time limit of the solver in seconds'),
+            Param('mip_gap', 'float', min_value=0.0, max_value=1.0,
+                  description='(ilp) relative gap tolerance of the solver'),
+            Param('threads', 'int', min_value=1, max_value=64,
+                  description='(ilp) the number of threads of the solver'),
+            Param('warm_start', 'bool', default=True,
+                  description='(ilp) start from the greedy solution'),
+        ]
+    )),
+])
+
+
+def validate(algo, params):
+    '''
+    validate and convert parameters of algo
+
+    Returns:
+      dict of name -> converted value
+
+    Raises:
+      ParamError
+    '''
+    schema = SCHEMAS.get(algo)
+    if schema is None:
+        raise ParamError([{
+            'param': 'algo', 'message': 'must be one of {}'.format(
+                ', '.join(SCHEMAS)
+            ), 'value': algo
+        }])
+    return schema.validate(params)
+
+
+def describe():
+    '''
+    Returns:
+      dict of algo -> description and parameters (JSON serializable)
+    '''
+    return collections.OrderedDict(
+        (algo, schema.describe()) for algo, schema in SCHEMAS.iteritems()
+    )
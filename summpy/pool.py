@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import signal
+import Queue
+import resource
+import threading
+import multiprocessing
+
+
+class WorkerError(Exception):
+    pass
+
+
+def _rss_kb():
+    '''
+    current resident set size of this process in kilobytes
+    (peak size if /proc is not available)
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() // 1024
+    except (IOError, OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _private_kb():
+    '''
+    memory of this process not shared with other processes (e.g. pages
+    of the parent written after fork) in kilobytes, or None if
+    /proc/self/smaps_rollup is not available
+    '''
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            return sum(
+                int(line.split()[1]) for line in f
+                if line.startswith(('Private_Clean:', 'Private_Dirty:'))
+            )
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+def _worker(conn, initializer, finalizer, status, max_jobs,
+            max_rss_growth_kb):
+    '''
+    main loop of a worker process.
+    receives (func, args, kwargs) and sends back
+    (succeeded, result or exception, retiring, status).
+    '''
+    # the parent handles Ctrl-C, and handlers of the parent (e.g. of a
+    # server) are not inherited by workers forked later
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for name in ('SIGTERM', 'SIGHUP', 'SIGUSR1'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), signal.SIG_DFL)
+    if initializer is not None:
+        initializer()
+    base_rss_kb = _rss_kb()
+    n_jobs = 0
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, IOError):
+            break
+        if job is None:
+            break
+        func, args, kwargs = job
+        try:
+            result = (True, func(*args, **kwargs))
+        except Exception, e:
+            result = (False, e)
+        n_jobs += 1
+        rss_kb = _rss_kb()
+        retiring = (
+            (max_jobs is not None and n_jobs >= max_jobs)
+            or (max_rss_growth_kb is not None
+                and rss_kb - base_rss_kb > max_rss_growth_kb)
+        )
+        worker_status = {
+            'jobs': n_jobs, 'rss_kb': rss_kb, 'private_kb': _private_kb()
+        }
+        if status is not None:
+            worker_status['info'] = status()
+        try:
+            conn.send(result + (retiring, worker_status))
+        except Exception, e:  # e.g. result or exception is not picklable
+            conn.send((False, WorkerError('{}: {}'.format(
+                type(e).__name__, e
+            )), retiring, worker_status))
+        if retiring:
+            break
+    if finalizer is not None:
+        finalizer()
+    conn.close()
+
+
+class _Worker(object):
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.status = None
+
+
+class ProcessPool(object):
+    '''
+    pool of pre-forked worker processes.
+
+    modules imported (and dictionaries loaded) before the pool is created
+    are shared with the workers. unlike multiprocessing.Pool, a job is
+    run by apply() in the calling thread, so that it can be used from
+    the threads of a server, and workers are replaced after max_jobs
+    jobs or when their RSS grows by max_rss_growth_mb.
+
+    a forked process inherits locks held by other threads (e.g. of
+    logging or the segmenter cache) which are never released in it.
+    so the pool should be created before the threads of a server
+    start, and replacements are forked by a maintenance thread of the
+    pool, which holds no locks of the application, instead of the
+    threads calling apply().
+
+    Args:
+      processes: the number of workers (default: the number of CPUs)
+      initializer: (optional) function called in each new worker
+      finalizer: (optional) function called when a worker exits
+      status: (optional) function called in a worker after each job.
+        the latest results are returned by worker_status().
+      max_jobs: the number of jobs before a worker is replaced
+      max_rss_growth_mb: RSS growth (from the start of a worker)
+        before the worker is replaced
+    '''
+
+    def __init__(self, processes=None, initializer=None, finalizer=None,
+                 status=None, max_jobs=None, max_rss_growth_mb=None):
+        self.processes = processes or multiprocessing.cpu_count()
+        self.initializer = initializer
+        self.finalizer = finalizer
+        self.status = status
+        self.max_jobs = max_jobs
+        self.max_rss_growth_kb = (
+            None if max_rss_growth_mb is None else max_rss_growth_mb * 1024
+        )
+        self.recycled = 0  # the number of retired workers
+        self.crashed = 0  # the number of workers died in jobs
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._idle = Queue.Queue()
+        self._retired = Queue.Queue()  # workers to be replaced
+        self._closed = False
+        for _ in range(self.processes):
+            self._idle.put(self._spawn())
+        self._maintainer = threading.Thread(target=self._maintain)
+        self._maintainer.daemon = True
+        self._maintainer.start()
+
+    def _spawn(self):
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_worker,
+            args=(child_conn, self.initializer, self.finalizer, self.status,
+                  self.max_jobs, self.max_rss_growth_kb)
+        )
+        process.daemon = True
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, conn)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _maintain(self):
+        '''
+        main loop of the maintenance thread.
+        stops retired workers and forks their replacements.
+        '''
+        while True:
+            worker = self._retired.get()
+            if worker is None:
+                break
+            worker.conn.close()
+            worker.process.join(1.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            with self._lock:
+                self._workers.discard(worker)
+                closed = self._closed
+            if not closed:
+                self._idle.put(self._spawn())
+
+    def _replace(self, worker):
+        '''
+        let the maintenance thread replace worker
+        '''
+        self._retired.put(worker)
+
+    def apply(self, func, args=(), kwargs=None):
+        '''
+        run func(*args, **kwargs) in a worker and wait for the result.
+        func, the arguments and the result must be picklable.
+        exceptions raised by func are raised again.
+        '''
+        if self._closed:
+            raise WorkerError('pool is closed')
+        worker = self._idle.get()
+        try:
+            worker.conn.send((func, args, kwargs or {}))
+        except (IOError, OSError), e:
+            self.crashed += 1
+            self._replace(worker)
+            raise WorkerError('worker died: {}'.format(e))
+        except Exception:  # e.g. arguments are not picklable
+            self._idle.put(worker)
+            raise
+        try:
+            succeeded, result, retiring, worker.status = worker.conn.recv()
+        except (EOFError, IOError, OSError), e:
+            # e.g. killed by the OOM killer
+            self.crashed += 1
+            self._replace(worker)
+            raise WorkerError('worker {} died in a job: {}'.format(
+                worker.process.pid, type(e).__name__
+            ))
+        if retiring:
+            self.recycled += 1
+            self._replace(worker)
+        else:
+            self._idle.put(worker)
+        if not succeeded:
+            raise result
+        return result
+
+    def worker_status(self):
+        '''
+        Returns:
+          dict of pid -> status of the worker after its last job, i.e.
+          {'jobs': the number of jobs, 'rss_kb': RSS,
+           'private_kb': memory not shared with other processes (or None),
+           'info': the result of status function}
+        '''
+        with self._lock:
+            return dict(
+                (worker.process.pid, worker.status)
+                for worker in self._workers if worker.status is not None
+            )
+
+    def close(self, timeout=10.0):
+        '''
+        stop workers after their current jobs.
+        workers that do not stop in timeout seconds are terminated.
+        '''
+        with self._lock:
+            self._closed = True
+        while True:
+            with self._lock:
+                if len(self._workers) == 0:
+                    break
+            try:
+                # (workers retiring now are not returned to the queue)
+                worker = self._idle.get(timeout=1.0)
+            except Queue.Empty:
+                continue
+            try:
+                worker.conn.send(None)
+            except (IOError, OSError):
+                pass
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            with self._lock:
+                self._workers.discard(worker)
+        self._retired.put(None)
+        self._maintainer.join()
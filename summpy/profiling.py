@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+
+
+_hooks = []
+
+
+def add_hook(hook):
+    '''
+    register a function called with the record of every profiled stage,
+    e.g. {'stage': 'similarity', 'wall': 0.01, 'cpu': 0.01, 'edges': 100}.
+    profiling is enabled for every request while a hook is registered.
+    '''
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+class _Stage(object):
+
+    def __init__(self, profiler, record):
+        self.profiler = profiler
+        self.record = record
+
+    def __enter__(self):
+        self._wall = time.time()
+        self._cpu = time.clock()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.record['wall'] = time.time() - self._wall
+        self.record['cpu'] = time.clock() - self._cpu
+        if exc_type is not None:
+            self.record['error'] = exc_type.__name__
+        self.profiler.records.append(self.record)
+        for hook in self.profiler.hooks:
+            hook(self.record)
+        return False
+
+
+class Profiler(object):
+    '''
+    records wall time, CPU time (of the process) and sizes of stages.
+
+    usage:
+      with profiler.stage('similarity', sentences=N) as record:
+          ...
+          record['edges'] = adj.nnz
+    '''
+
+    enabled = True
+
+    def __init__(self, hooks=None):
+        self.records = []
+        self.hooks = list(_hooks) if hooks is None else hooks
+
+    def stage(self, name, **sizes):
+        sizes['stage'] = name
+        return _Stage(self, sizes)
+
+    def extend(self, records):
+        '''
+        add records of stages profiled elsewhere (e.g. in another process)
+        '''
+        for record in records:
+            self.records.append(record)
+            for hook in self.hooks:
+                hook(record)
+
+
+class _NullStage(object):
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class NullProfiler(object):
+    '''
+    profiler that records nothing
+    '''
+
+    enabled = False
+    records = ()
+    _stage = _NullStage()
+
+    def stage(self, name, **sizes):
+        return self._stage
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def get_profiler(profiler=None, debug=False):
+    '''
+    Returns:
+      profiler if given, a new Profiler if debug or any hook is registered,
+      NULL_PROFILER otherwise.
+    '''
+    if profiler is not None:
+        return profiler
+    if debug or len(_hooks) > 0:
+        return Profiler()
+    return NULL_PROFILER
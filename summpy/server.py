@@ -3,33 +3,416 @@
 
 import sys
 import os
-import re
+import time
 import getopt
+import Queue
+import threading
 import cherrypy
 import json
 
 from . import tools
+from . import batch
+from . import metrics
+from . import params
+from .profiling import Profiler
+from .deadline import Deadline, DeadlineExceeded, Cancelled
+from .pool import ProcessPool
+
+
+_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+_CHARS_BUCKETS = (100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+_SENTENCES_BUCKETS = (1, 3, 10, 30, 100, 300, 1000, 3000, 10000)
+_SEGMENTER_CACHE_STATS = ('hits', 'misses', 'evictions', 'entries', 'bytes')
+_RESULT_CACHE_STATS = (
+    'hits', 'misses', 'evictions', 'expirations', 'entries', 'bytes'
+)
+# threads for requests that bypass admission control (e.g. /healthz)
+_SPARE_THREADS = 2
+# seconds between checks of cancellation of a request waiting for a worker
+_ADMISSION_POLL = 1.0
+
+
+def _parse_batch(body):
+    '''
+    Returns:
+      list of items of a JSON array or NDJSON
+    '''
+    body = body.decode('utf-8').strip()
+    if body.startswith(u'['):
+        items = json.loads(body)
+    else:
+        items = [
+            json.loads(line) for line in body.splitlines() if line.strip()
+        ]
+    if not isinstance(items, list):
+        raise ValueError('request body must be a JSON array or NDJSON')
+    return items
+
+
+def _failed_item(index, e):
+    '''
+    Returns:
+      dict of the result line of a batch item whose handling raised e
+    '''
+    return {
+        'index': index, 'error': '{}: {}'.format(type(e).__name__, e),
+        'status': 500
+    }
+
+
+def _param_name(name):
+    '''
+    Returns:
+      name of a parameter (str)
+
+    Raises:
+      ValueError if name is not an ASCII string
+    '''
+    if not isinstance(name, basestring):
+        raise ValueError
+    try:
+        return str(name)
+    except UnicodeError:
+        raise ValueError
+
+
+def _result_cache_stat(name):
+    def collect():
+        stats = batch.result_cache_stats()
+        return {} if stats is None else {(): stats[name]}
+    return collect
+
+
+def _etag_matches(etag, if_none_match):
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags or 'W/' + etag in tags
+
+
+def _fallback_params(fallback, summarizer_params):
+    '''
+    parameters also accepted by the fallback algorithm
+    '''
+    accepted = params.SCHEMAS[fallback].params
+    return dict(
+        (k, v) for k, v in summarizer_params.iteritems() if k in accepted
+    )
+
+
+def _init_worker():
+    tools.reinit_segmenter_cache()
+
+
+def _close_worker():
+    tools.configure_segmenter_cache(max_entries=0)
+
+
+def _summarize_in_worker(text, algo, deadline, summarizer_params):
+    '''
+    batch.summarize in a worker process
+
+    Returns: tuple
+      (summary, debug_info, profiled stages)
+    '''
+    profiler = Profiler(hooks=[])
+    summary, debug_info = batch.summarize(
+        text, algo, use_cache=False, profiler=profiler, deadline=deadline,
+        **summarizer_params
+    )
+    return summary, debug_info, profiler.records
+
+
+class Admission(object):
+    '''
+    limits the number of concurrent summarizations to workers.
+    up to queue_size requests wait for a worker, and more requests are
+    rejected immediately.
+    '''
+
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def enter(self, deadline=None):
+        '''
+        wait for a worker until deadline
+
+        Returns:
+          True if admitted, False if the queue is full or deadline passed
+        '''
+        with self._cond:
+            if self.active >= self.workers:
+                if self.waiting >= self.queue_size:
+                    return False
+                self.waiting += 1
+                try:
+                    while self.active >= self.workers:
+                        if deadline is None:
+                            self._cond.wait()
+                        elif deadline.expired():
+                            return False
+                        else:
+                            self._cond.wait(
+                                min(deadline.remaining(), _ADMISSION_POLL)
+                            )
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            return True
+
+    def leave(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
 
 
 class Summarizer(object):
+    '''
+    Args:
+      workers: the number of concurrent summarizations
+      queue_size: the number of requests waiting for a worker.
+        more requests are rejected with 503.
+      timeout: deadline of a request in seconds including the time in the
+        queue. 504 is returned when it passes. (None: no deadline)
+      max_chars: dict of algo -> the maximum length of text.
+        longer text is rejected with 413 (or falls back, see below).
+      fallback: dict of algo -> cheaper algo, e.g. {'mcp': 'lexrank'}.
+        algo runs with fallback_share of the remaining time, and if it
+        does not finish, the fallback algo runs with the rest.
+        it is also used for text longer than max_chars of algo.
+      fallback_share: see fallback
+      executor: 'thread' summarizes in the server threads, 'process' in
+        workers pre-forked processes (see pool.ProcessPool), so that
+        summarizations are not serialized by the GIL
+      max_jobs, max_rss_growth_mb: ('process' only) a worker process is
+        replaced after max_jobs jobs or when its RSS grows by
+        max_rss_growth_mb
+    '''
+
+    def __init__(self, workers=10, queue_size=10, timeout=None,
+                 max_chars=None, fallback=None, fallback_share=0.5,
+                 executor='thread', max_jobs=None, max_rss_growth_mb=None):
+        if executor not in ('thread', 'process'):
+            raise ValueError('unknown executor: {}'.format(executor))
+        for algo in (fallback or {}).values():
+            if algo not in params.SCHEMAS:
+                raise ValueError('unknown fallback algorithm: {}'.format(algo))
+        self.pool = None
+        if executor == 'process':
+            # (before worker processes are forked)
+            batch.warmup()
+            self.pool = ProcessPool(
+                workers, initializer=_init_worker, finalizer=_close_worker,
+                status=tools.segmenter_cache_stats, max_jobs=max_jobs,
+                max_rss_growth_mb=max_rss_growth_mb
+            )
+        self.admission = Admission(workers, queue_size)
+        self.timeout = timeout
+        self.max_chars = max_chars or {}
+        self.fallback = fallback or {}
+        self.fallback_share = fallback_share
+        self.started = time.time()
+        self.registry = registry = metrics.Registry()
+        self.requests = registry.counter(
+            'summpy_requests_total', 'Summarization requests.',
+            ('algo', 'status')
+        )
+        self.latency = registry.histogram(
+            'summpy_request_duration_seconds',
+            'Summarization request latency in seconds.',
+            ('algo',), _LATENCY_BUCKETS
+        )
+        self.input_chars = registry.histogram(
+            'summpy_input_characters', 'Characters in input texts.',
+            ('algo',), _CHARS_BUCKETS
+        )
+        self.input_sentences = registry.histogram(
+            'summpy_input_sentences', 'Sentences in input texts.',
+            ('algo',), _SENTENCES_BUCKETS
+        )
+        self.errors = registry.counter(
+            'summpy_errors_total', 'Failed requests by exception type.',
+            ('algo', 'exception')
+        )
+        self.in_flight = registry.gauge(
+            'summpy_requests_in_flight', 'Requests being processed.'
+        )
+        self.queued = registry.gauge(
+            'summpy_requests_queued', 'Requests waiting for a worker.',
+            func=lambda: {(): self.admission.waiting}
+        )
+        self.rejected = registry.counter(
+            'summpy_rejected_total', 'Requests rejected by admission control.',
+            ('algo', 'reason')
+        )
+        self.fallbacks = registry.counter(
+            'summpy_fallbacks_total', 'Requests summarized by fallback algo.',
+            ('algo', 'fallback', 'reason')
+        )
+        self.stage_time = registry.histogram(
+            'summpy_stage_duration_seconds',
+            'Wall time of summarization stages in seconds.',
+            ('algo', 'stage'), _LATENCY_BUCKETS
+        )
+        for name in _SEGMENTER_CACHE_STATS:
+            collect = self._segmenter_cache_stat(name)
+            if name in ('hits', 'misses', 'evictions'):
+                registry.counter(
+                    'summpy_segmenter_cache_{}_total'.format(name),
+                    'Word segmenter cache {}.'.format(name), func=collect
+                )
+            else:
+                registry.gauge(
+                    'summpy_segmenter_cache_' + name,
+                    'Word segmenter cache {}.'.format(name), func=collect
+                )
+        for name in _RESULT_CACHE_STATS:
+            collect = _result_cache_stat(name)
+            if name in ('entries', 'bytes'):
+                registry.gauge(
+                    'summpy_result_cache_' + name,
+                    'Result cache {}.'.format(name), func=collect
+                )
+            else:
+                registry.counter(
+                    'summpy_result_cache_{}_total'.format(name),
+                    'Result cache {}.'.format(name), func=collect
+                )
+        self.not_modified = registry.counter(
+            'summpy_not_modified_total',
+            'Requests answered with 304 Not Modified.', ('algo',)
+        )
+        if self.pool is not None:
+            registry.counter(
+                'summpy_worker_recycles_total',
+                'Worker processes replaced after max jobs or RSS growth.',
+                func=lambda: {(): self.pool.recycled}
+            )
+            registry.counter(
+                'summpy_worker_crashes_total',
+                'Worker processes died in jobs.',
+                func=lambda: {(): self.pool.crashed}
+            )
+            registry.gauge(
+                'summpy_worker_rss_bytes', 'RSS of worker processes.',
+                ('pid',), func=lambda: dict(
+                    ((pid,), status['rss_kb'] * 1024)
+                    for pid, status in self.pool.worker_status().iteritems()
+                )
+            )
+            registry.gauge(
+                'summpy_worker_private_bytes',
+                'Memory of worker processes not shared with other processes.',
+                ('pid',), func=lambda: dict(
+                    ((pid,), status['private_kb'] * 1024)
+                    for pid, status in self.pool.worker_status().iteritems()
+                    if status.get('private_kb') is not None
+                )
+            )
+
+    def segmenter_cache_stats(self):
+        '''
+        Returns:
+          stats of the word segmenter cache (see tools.segmenter_cache_stats)
+          summed over worker processes
+        '''
+        if self.pool is None:
+            return tools.segmenter_cache_stats()
+        stats = [
+            status['info'] for status in self.pool.worker_status().values()
+            if status.get('info') is not None
+        ]
+        if len(stats) == 0:
+            return None
+        return dict(
+            (name, sum(s[name] for s in stats))
+            for name in _SEGMENTER_CACHE_STATS
+        )
 
-    def __init__(self):
-        self.summarizers = {}
+    def _segmenter_cache_stat(self, name):
+        def collect():
+            stats = self.segmenter_cache_stats()
+            return {} if stats is None else {(): stats[name]}
+        return collect
 
-    def get_summarizer(self, name):
+    def _run(self, text, algo, deadline, profiler, summarizer_params):
+        if self.pool is None:
+            return batch.summarize(
+                text, algo, use_cache=False, profiler=profiler,
+                deadline=deadline, **summarizer_params
+            )
+        summary, debug_info, records = self.pool.apply(
+            _summarize_in_worker, (text, algo, deadline, summarizer_params)
+        )
+        profiler.extend(records)
+        return summary, debug_info
+
+    def _observe_stage(self, algo, record):
+        self.stage_time.observe(record['wall'], algo=algo,
+                                stage=record['stage'])
+        if record['stage'] == 'split' and 'sentences' in record:
+            self.input_sentences.observe(record['sentences'], algo=algo)
+
+    def _too_long(self, text, algo):
+        max_chars = self.max_chars.get(algo)
+        return max_chars is not None and len(text) > max_chars
+
+    def _summarize(self, text, algo, algo_label, deadline, profiler,
+                   summarizer_params):
         '''
-        import summarizers on-demand
+        Returns: tuple
+          (summary, debug_info) of algo, or of the fallback algo if algo
+          does not finish in its share of deadline
         '''
-        if name in self.summarizers:
-            pass
-        elif name == 'lexrank':
-            from . import lexrank
-            self.summarizers[name] = lexrank.summarize
-        elif name == 'mcp':
-            from . import mcp_summ
-            self.summarizers[name] = mcp_summ.summarize
+        fallback = self.fallback.get(algo)
+        if fallback is None or deadline is None or deadline.timeout is None:
+            return self._run(text, algo, deadline, profiler,
+                             summarizer_params)
+        try:
+            return self._run(
+                text, algo, deadline.fraction(self.fallback_share), profiler,
+                summarizer_params
+            )
+        except Cancelled:
+            raise
+        except DeadlineExceeded:
+            self.fallbacks.inc(algo=algo_label, fallback=fallback,
+                               reason='deadline')
+        summary, debug_info = self._run(
+            text, fallback, deadline, profiler,
+            _fallback_params(fallback, summarizer_params)
+        )
+        debug_info['fallback'] = fallback
+        return summary, debug_info
 
-        return self.summarizers[name]
+    @cherrypy.expose
+    def metrics(self):
+        '''
+        metrics in Prometheus text format
+        '''
+        return self.registry.exposition()
+
+    @cherrypy.expose
+    def algorithms(self):
+        '''
+        algorithms and their parameters (types, ranges and defaults)
+        '''
+        cherrypy.response.headers['Content-Type'] = 'application/json'
+        return json.dumps(params.describe(), indent=2)
+
+    @cherrypy.expose
+    def healthz(self):
+        return json.dumps({
+            'status': 'ok',
+            'uptime': time.time() - self.started,
+            'in_flight': self.in_flight.value()
+        })
 
     @cherrypy.expose
     def summarize(self, text=None, algo=u'lexrank', **summarizer_params):
@@ -42,61 +425,340 @@ class Summarizer(object):
               - 'divrank' DivRank (Diverse Rank)
               - 'mcp' select sentences in terms of maximum coverage problem
 
-          summarizer_params examples:
+          summarizer_params examples: (see /algorithms for all)
             char_limit: summary length (the number of characters)
             sent_limit: (not supported with mcp)
               summary length (the number of sentences)
             imp_require: (lexrank only)
               cumulative LexRank score [0.0-1.0]
+
+        invalid parameters are rejected with 400 and
+        {"error": ..., "errors": [{"param": ..., "message": ...}, ...]}
         '''
-        try:  # TODO: generate more useful error message
-            # fix parameter type
-            for param, value in summarizer_params.items():
-                if value == '':
-                    del summarizer_params[param]
-                    continue
-                elif re.match(r'^\d*.\d+$', value):
-                    value = float(value)
-                elif re.match(r'^\d+$', value):
-                    value = int(value)
-                elif value == 'true':
-                    value = True
-                elif value == 'false':
-                    value = False
-                summarizer_params[param] = value
-
-            if algo in ('lexrank', 'clexrank', 'divrank'):
-                summarizer = self.get_summarizer('lexrank')
-                if algo == 'clexrank':
-                    summarizer_params['continuous'] = True
-                if algo == 'divrank':
-                    summarizer_params['use_divrank'] = True
-            elif algo == 'mcp':
-                summarizer = self.get_summarizer('mcp')
-
-            summary, debug_info = summarizer(text, **summarizer_params)
+        # empty fields of a form are not given
+        summarizer_params = dict(
+            (param, value) for param, value in summarizer_params.iteritems()
+            if value != ''
+        )
+        status, result, etag = self._handle(
+            text, algo, summarizer_params,
+            if_none_match=cherrypy.request.headers.get('If-None-Match')
+        )
+        cherrypy.response.status = status
+        if etag is not None:
+            cherrypy.response.headers['ETag'] = etag
+        if status == 304:
+            return ''
+        if status == 503:
+            cherrypy.response.headers['Retry-After'] = '1'
+        return json.dumps(
+            tools.tree_encode(result), ensure_ascii=False, indent=2
+        )
+
+    @cherrypy.expose
+    def summarize_batch(self, parallel=1):
+        '''
+        summarize many documents in a request.
+
+        the request body is a JSON array or NDJSON (a JSON object per line)
+        of {"text": ..., "algo": ..., "params": {...}} ("id" is optional).
+        results are streamed in NDJSON as each document is summarized:
+        {"index": position in the request, "id": ...,
+         "summary": [...], "debug_info": {...}} or {..., "error": ...}
+
+        Args:
+          parallel: the number of documents summarized at once
+            (at most the number of workers)
+        '''
+        try:
+            items = _parse_batch(cherrypy.request.rfile.read())
+            parallel = max(1, min(int(parallel), self.admission.workers))
+        except ValueError, e:
+            cherrypy.response.status = 400
+            cherrypy.response.headers['Content-Type'] = 'application/json'
+            return json.dumps({'error': str(e)})
+
+        cherrypy.response.headers['Content-Type'] = 'application/x-ndjson'
+        results = Queue.Queue()
+        jobs = Queue.Queue()
+        for job in enumerate(items):
+            jobs.put(job)
+        # set when the client goes away
+        cancelled = threading.Event()
+
+        def work():
+            while not cancelled.is_set():
+                try:
+                    index, item = jobs.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    result = self._handle_item(index, item, cancelled)
+                except Exception, e:
+                    # (stream() waits for a result of every item)
+                    result = _failed_item(index, e)
+                results.put(result)
+
+        threads = [
+            threading.Thread(target=work) for _ in range(min(parallel,
+                                                            len(items)))
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        def stream():
+            try:
+                for _ in range(len(items)):
+                    yield json.dumps(
+                        results.get(), ensure_ascii=False,
+                        separators=(',', ':')
+                    ).encode('utf-8') + '\n'
+            finally:
+                cancelled.set()
+        return stream()
+    # (the body is read as is, whatever its Content-Type is)
+    summarize_batch._cp_config = {
+        'response.stream': True, 'request.process_request_body': False
+    }
+
+    def _handle_item(self, index, item, cancelled=None):
+        '''
+        Returns:
+          dict of a result line of summarize_batch
+        '''
+        result = {'index': index}
+        if not isinstance(item, dict):
+            result.update({'error': 'item must be a JSON object',
+                           'status': 400})
+            return result
+        if 'id' in item:
+            result['id'] = item['id']
+        algo = item.get('algo', u'lexrank')
+        if not isinstance(algo, basestring):
+            result.update({'error': 'algo must be a string', 'status': 400})
+            return result
+        item_params = item.get('params') or {}
+        if not isinstance(item_params, dict):
+            result.update({'error': 'params must be a JSON object',
+                           'status': 400})
+            return result
+        try:
+            item_params = dict(
+                (_param_name(k), v) for k, v in item_params.iteritems()
+            )
+        except ValueError:
+            result.update({'error': 'parameter names must be ASCII',
+                           'status': 400})
+            return result
+        status, summarized, _ = self._handle(
+            item.get('text'), algo, item_params, cancelled=cancelled
+        )
+        result.update(summarized)
+        if status != 200:
+            result['status'] = status
+        return result
+
+    def _handle(self, text, algo, summarizer_params, if_none_match=None,
+                cancelled=None):
+        '''
+        summarize a text under admission control, deadline and fallback,
+        and record metrics. results are looked up in and stored to the
+        result cache (see batch.configure_result_cache).
+
+        Args:
+          if_none_match: If-None-Match header. if it has the ETag of the
+            request, 304 is returned without summarization.
+          cancelled: (optional) threading.Event set when the client goes
+            away. the summarization stops at its next deadline check and
+            499 is returned. (worker processes finish their jobs)
+
+        Returns: tuple
+          (
+            HTTP status,
+            {'summary': ..., 'debug_info': ...} or {'error': message},
+            ETag (None if the result is not cacheable)
+          )
+        '''
+        # unknown algorithms share a label not to grow the metrics unbounded
+        algo_label = algo if algo in batch.ALGORITHMS else 'unknown'
+        profiler = Profiler()
+        profiler.hooks.append(
+            lambda record: self._observe_stage(algo_label, record)
+        )
+        start = time.time()
+        try:
+            if not isinstance(text, basestring):
+                raise params.ParamError([
+                    {'param': 'text', 'message': 'required'}
+                ])
+            summarizer_params = params.validate(algo, summarizer_params)
+        except params.ParamError, e:
+            self.rejected.inc(algo=algo_label, reason='invalid_params')
+            return 400, {'error': str(e), 'errors': e.errors}, None
+
+        # the same text, algo and params result in the same summary
+        key = batch.result_key(text, algo, summarizer_params)
+        etag = None if key is None else '"{}"'.format(key)
+        if etag is not None and _etag_matches(etag, if_none_match):
+            self.not_modified.inc(algo=algo_label)
+            return 304, {}, etag
+        cached = batch.cached_result(key)
+        if cached is not None:
+            self.requests.inc(algo=algo_label, status='ok')
+            self.latency.observe(time.time() - start, algo=algo_label)
+            return 200, {'summary': cached[0], 'debug_info': cached[1]}, etag
 
+        deadline = None
+        if self.timeout is not None or cancelled is not None:
+            deadline = Deadline(self.timeout, cancelled)
+        self.input_chars.observe(len(text), algo=algo_label)
+        size_fallback = None
+        if self._too_long(text, algo):
+            fallback = self.fallback.get(algo)
+            if fallback is None or self._too_long(text, fallback):
+                self.rejected.inc(algo=algo_label, reason='input_size')
+                return 413, {
+                    'error': 'text is too long for {}'.format(algo)
+                }, None
+            self.fallbacks.inc(algo=algo_label, fallback=fallback,
+                               reason='input_size')
+            algo = size_fallback = fallback
+            summarizer_params = _fallback_params(fallback, summarizer_params)
+
+        if not self.admission.enter(deadline):
+            reason = 'busy'
+            if deadline is not None and deadline.is_cancelled():
+                reason = 'cancelled'
+            elif deadline is not None and deadline.expired():
+                reason = 'timeout'
+            self.rejected.inc(algo=algo_label, reason=reason)
+            return 503, {'error': 'server is busy'}, None
+
+        self.in_flight.inc()
+        try:  # TODO: generate more useful error message
+            summary, debug_info = self._summarize(
+                text, algo, algo_label, deadline, profiler, summarizer_params
+            )
+        except Cancelled, e:
+            self.requests.inc(algo=algo_label, status='cancelled')
+            return 499, {'error': str(e)}, None
         except Exception, e:
-            return json.dumps({'error': str(e)}, ensure_ascii=False, indent=2)
+            self.requests.inc(algo=algo_label, status='error')
+            self.errors.inc(algo=algo_label, exception=type(e).__name__)
+            if isinstance(e, DeadlineExceeded):
+                return 504, {'error': str(e)}, None
+            return 200, {'error': str(e)}, None
         else:
-            res = json.dumps(
-                tools.tree_encode({
-                    'summary': summary, 'debug_info': debug_info
-                }),
-                ensure_ascii=False, indent=2
-            )
-            return res
+            self.requests.inc(algo=algo_label, status='ok')
+            if size_fallback is not None:
+                debug_info.setdefault('fallback', size_fallback)
+            if 'fallback' in debug_info:
+                # (not the result of the requested algo, and depends on
+                # the load and the configuration of the server)
+                etag = None
+            else:
+                batch.cache_result(key, summary, debug_info)
+            return 200, {'summary': summary, 'debug_info': debug_info}, etag
+        finally:
+            self.admission.leave()
+            self.in_flight.dec()
+            self.latency.observe(time.time() - start, algo=algo_label)
 
 
-if __name__ == '__main__':
+OPTIONS = 'h:p:w:q:t:m:f:x:n:r:c:l:d:'
+
+USAGE = '''
+Usage:
+  python {prog} -h <host> -p <port> [ -w <workers> ] [ -q <queue_size> ]
+  {pad}[ -t <timeout> ] [ -m <max_chars> ] [ -f <fallback> ]
+  {pad}[ -x thread | process ] [ -n <max_jobs> ]
+  {pad}[ -r <max_rss_growth_mb> ]
+  {pad}[ -c <cache_size> ] [ -l <cache_ttl> ] [ -d <cache_path> ]
+  Args:
+    -w: the number of concurrent summarizations (default: 10)
+    -q: the number of requests waiting for a worker (default: 10)
+    -t: deadline of a request in seconds (default: none)
+    -m: maximum length of text of each algo, e.g. mcp=20000,lexrank=200000
+    -f: cheaper algo used when the deadline or -m would be exceeded,
+        e.g. mcp=lexrank
+    -x: run summarizations in server threads (default) or in -w worker
+        processes
+    -n: (process only) replace a worker process after n jobs
+    -r: (process only) replace a worker process when its RSS grows by
+        the given megabytes
+    -c: the number of cached results (default: 0, disabled)
+    -l: seconds before cached results expire (default: never)
+    -d: sqlite3 file to store cached results across restarts
+'''.strip()
 
-    options, args = getopt.getopt(sys.argv[1:], 'h:p:')
+
+def _parse_mapping(value, type_):
+    mapping = {}
+    for item in value.split(','):
+        algo, _, v = item.partition('=')
+        mapping[algo] = type_(v)
+    return mapping
+
+
+def parse_options(argv, prog):
+    '''
+    parse the command line options of a server (see USAGE).
+    prints the usage and exits if -h or -p is missing.
+
+    Returns:
+      dict of option -> value
+    '''
+    options, args = getopt.getopt(argv, OPTIONS)
     options = dict(options)
+    if '-h' not in options or '-p' not in options:
+        print USAGE.format(prog=prog, pad=' ' * (len(prog) + 8))
+        sys.exit(0)
+    return options
+
+
+def summarizer_from_options(options):
+    '''
+    configure the result cache and create a Summarizer from the options
+    '''
+    if '-c' in options:
+        batch.configure_result_cache(
+            max_entries=int(options['-c']),
+            ttl=float(options['-l']) if '-l' in options else None,
+            path=options.get('-d')
+        )
+    max_chars, fallback = None, None
+    if '-m' in options:
+        max_chars = _parse_mapping(options['-m'], int)
+    if '-f' in options:
+        fallback = _parse_mapping(options['-f'], str)
+    # the first requests do not wait for imports and the dictionary
+    batch.warmup()
+    return Summarizer(
+        workers=int(options.get('-w', 10)),
+        queue_size=int(options.get('-q', 10)),
+        timeout=float(options['-t']) if '-t' in options else None,
+        max_chars=max_chars, fallback=fallback,
+        executor=options.get('-x', 'thread'),
+        max_jobs=int(options['-n']) if '-n' in options else None,
+        max_rss_growth_mb=float(options['-r']) if '-r' in options else None
+    )
+
+
+if __name__ == '__main__':
+
+    options = parse_options(sys.argv[1:], 'server.py')
     host, port = options['-h'], int(options['-p'])
+    summarizer = summarizer_from_options(options)
+    admission = summarizer.admission
 
     cherrypy.config.update({
         'server.socket_host': host,
-        'server.socket_port': port
+        'server.socket_port': port,
+        # queued requests wait in server threads
+        'server.thread_pool': (
+            admission.workers + admission.queue_size + _SPARE_THREADS
+        )
     })
 
     conf = {
@@ -109,9 +771,23 @@ if __name__ == '__main__':
                 ('Content-type', 'application/json')
             ]
         },
+        '/metrics': {
+            'tools.response_headers.on': True,
+            'tools.response_headers.headers': [
+                ('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+            ]
+        },
+        '/healthz': {
+            'tools.response_headers.on': True,
+            'tools.response_headers.headers': [
+                ('Content-type', 'application/json')
+            ]
+        },
         '/static': {
             'tools.staticdir.on': True,
             'tools.staticdir.dir': './server_data'
         }
     }
-    cherrypy.quickstart(Summarizer(), '/', conf)
+    if summarizer.pool is not None:
+        cherrypy.engine.subscribe('stop', summarizer.pool.close)
+    cherrypy.quickstart(summarizer, '/', conf)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import getopt
+import collections
+import numpy
+import scipy.sparse
+
+from . import tools
+from .lexrank import select_sentences
+from .misc.ranking import pagerank_matrix, divrank_matrix
+
+
+class IncrementalSummarizer(object):
+    '''
+    LexRank summarizer for unbounded text feeds.
+
+    Text is fed in chunks with feed(). Complete sentences are segmented
+    and linked to the sentences seen so far as they arrive, and summarize()
+    ranks the current similarity graph, starting from the previous scores.
+
+    Args:
+      continuous, sim_threshold, alpha, use_divrank, divrank_alpha:
+        same as lexrank.lexrank
+      window: if given, only the last window sentences are kept
+      max_pending: the maximum length of an incomplete sentence.
+        longer text (e.g. unbalanced parenthesis) is cut into a sentence.
+      max_iter, tol: passed to the ranker
+      warm_start: if True, ranking starts from the previous scores.
+        default is True for PageRank and False for DivRank, because
+        DivRank converges to different scores from different starting
+        vectors.
+    '''
+
+    def __init__(self, continuous=False, sim_threshold=0.1, alpha=0.9,
+                 use_divrank=False, divrank_alpha=0.25, window=None,
+                 max_pending=10000, max_iter=1000, tol=1.0e-6,
+                 warm_start=None):
+        self.continuous = continuous
+        self.sim_threshold = sim_threshold
+        self.alpha = alpha
+        self.use_divrank = use_divrank
+        self.divrank_alpha = divrank_alpha
+        self.window = window
+        self.max_pending = max_pending
+        self.max_iter = max_iter
+        self.tol = tol
+        self.warm_start = (
+            not use_divrank if warm_start is None else warm_start
+        )
+
+        self.sentences = []  # sentences in the window
+        self.offset = 0  # the number of sentences dropped from the window
+        self._pending = u''  # incomplete sentence
+        self._vocab = {}  # word -> column
+        # l2-normalized tf vectors of sentences in the window
+        self._X = scipy.sparse.csr_matrix((0, 0))
+        # edges between sentences (global sentence indexes)
+        self._edge_rows = numpy.zeros(0, dtype=int)
+        self._edge_cols = numpy.zeros(0, dtype=int)
+        self._edge_sims = numpy.zeros(0)
+        self._scores = numpy.zeros(0)  # scores of the last ranking
+        self._ranked = True  # False if the graph changed since last ranking
+        self.n_iter = 0  # the number of iterations of the last ranking
+
+    def feed(self, text):
+        '''
+        add text. complete sentences are added to the similarity graph,
+        the last (possibly incomplete) sentence is kept until more text
+        arrives.
+        '''
+        text = self._pending + text
+        spans = list(tools.sent_spans_ja(text))
+        if len(spans) == 0:
+            self._pending = u''
+            return
+        last_start = spans[-1][0]
+        self._pending = text[last_start:]
+        sentences = [text[start:end] for start, end in spans[:-1]]
+        if len(self._pending) > self.max_pending:
+            sentences.append(self._pending)
+            self._pending = u''
+        self._add_sentences(sentences)
+
+    def flush(self):
+        '''
+        add the pending (incomplete) sentence, e.g. at the end of the feed.
+        '''
+        if len(self._pending) > 0:
+            self._add_sentences([self._pending])
+            self._pending = u''
+
+    def _vectorize(self, sentence):
+        tf = collections.Counter(tools.word_segmenter_ja(sentence))
+        cols = numpy.array(
+            [self._vocab.setdefault(w, len(self._vocab)) for w in tf],
+            dtype=int
+        )
+        values = numpy.array(tf.values(), dtype=float)
+        norm = numpy.sqrt((values ** 2).sum())
+        if norm > 0:
+            values /= norm
+        return cols, values
+
+    def _add_sentences(self, sentences):
+        if len(sentences) == 0:
+            return
+        new_vecs = [self._vectorize(s) for s in sentences]
+        n_old = self._X.shape[0]
+        V = len(self._vocab)
+        X_new = scipy.sparse.csr_matrix(
+            (
+                numpy.concatenate([values for _, values in new_vecs]),
+                numpy.concatenate([cols for cols, _ in new_vecs]),
+                numpy.cumsum([0] + [len(cols) for cols, _ in new_vecs])
+            ),
+            shape=(len(new_vecs), V)
+        )
+        # (the vocabulary may have grown)
+        X_old = scipy.sparse.csr_matrix(
+            (self._X.data, self._X.indices, self._X.indptr), shape=(n_old, V)
+        )
+        X_all = self._X = scipy.sparse.vstack([X_old, X_new], format='csr')
+
+        # similarities between new sentences and all sentences in the window
+        sim = (X_new * X_all.T).tocoo()
+        rows, cols, sims = sim.row + n_old, sim.col, sim.data
+        if self.continuous:
+            keep = sims > 0
+        else:
+            keep = sims >= self.sim_threshold
+        keep &= rows != cols
+        rows, cols, sims = rows[keep], cols[keep], sims[keep]
+        # links from old sentences to new ones
+        old = cols < n_old
+        rows, cols, sims = (
+            numpy.concatenate([rows, cols[old]]),
+            numpy.concatenate([cols, rows[old]]),
+            numpy.concatenate([sims, sims[old]])
+        )
+
+        self._edge_rows = numpy.concatenate(
+            [self._edge_rows, rows + self.offset]
+        )
+        self._edge_cols = numpy.concatenate(
+            [self._edge_cols, cols + self.offset]
+        )
+        self._edge_sims = numpy.concatenate([self._edge_sims, sims])
+        self.sentences.extend(sentences)
+        self._ranked = False
+
+        if self.window is not None and len(self.sentences) > self.window:
+            self._trim(len(self.sentences) - self.window)
+
+    def _trim(self, n_drop):
+        '''
+        drop the oldest n_drop sentences
+        '''
+        self.offset += n_drop
+        del self.sentences[:n_drop]
+        self._X = self._X[n_drop:]
+        self._scores = self._scores[n_drop:]
+        keep = (
+            (self._edge_rows >= self.offset)
+            & (self._edge_cols >= self.offset)
+        )
+        self._edge_rows = self._edge_rows[keep]
+        self._edge_cols = self._edge_cols[keep]
+        self._edge_sims = self._edge_sims[keep]
+
+        # compact vocabulary if most of the words are not in the window
+        used = numpy.unique(self._X.indices)
+        if len(self._vocab) > 2 * len(used) + 1000:
+            remap = numpy.zeros(len(self._vocab), dtype=int)
+            remap[used] = numpy.arange(len(used))
+            is_used = numpy.zeros(len(self._vocab), dtype=bool)
+            is_used[used] = True
+            self._vocab = dict(
+                (w, remap[c]) for w, c in self._vocab.iteritems()
+                if is_used[c]
+            )
+            self._X = scipy.sparse.csr_matrix(
+                (self._X.data, remap[self._X.indices], self._X.indptr),
+                shape=(self._X.shape[0], len(used))
+            )
+
+    def adjacency(self):
+        '''
+        Returns:
+          adjacency matrix of sentences in the window (scipy.sparse.csr_matrix)
+        '''
+        N = len(self.sentences)
+        weights = (
+            self._edge_sims if self.continuous
+            else numpy.ones(len(self._edge_sims))
+        )
+        return scipy.sparse.csr_matrix(
+            (weights, (self._edge_rows - self.offset,
+                       self._edge_cols - self.offset)),
+            shape=(N, N)
+        )
+
+    def scores(self):
+        '''
+        Returns:
+          dict of sentence index (in the window) -> score
+        '''
+        if not self._ranked:
+            N = len(self.sentences)
+            nstart = numpy.repeat(1.0 / N, N)
+            if self.warm_start:
+                # previous scores and uniform scores for new sentences
+                nstart[:len(self._scores)] = self._scores
+            if self.use_divrank:
+                self._scores, self.n_iter = divrank_matrix(
+                    self.adjacency(), alpha=self.divrank_alpha, d=self.alpha,
+                    nstart=nstart, max_iter=self.max_iter, tol=self.tol,
+                    return_n_iter=True
+                )
+            else:
+                self._scores, self.n_iter = pagerank_matrix(
+                    self.adjacency(), alpha=self.alpha, nstart=nstart,
+                    max_iter=self.max_iter, tol=self.tol, return_n_iter=True
+                )
+            self._ranked = True
+        return dict(enumerate(self._scores.tolist()))
+
+    def summarize(self, sent_limit=None, char_limit=None, imp_require=None,
+                  debug=False):
+        '''
+        summarize sentences fed so far (in the window).
+        see lexrank.summarize for the arguments.
+        '''
+        debug_info = {}
+        scores = self.scores()
+        summary_sents = select_sentences(
+            self.sentences, scores, sent_limit=sent_limit,
+            char_limit=char_limit, imp_require=imp_require
+        )
+        if debug:
+            debug_info.update({
+                'sentences': self.sentences, 'scores': scores,
+                'offset': self.offset, 'n_iter': self.n_iter
+            })
+        return summary_sents, debug_info
+
+
+if __name__ == '__main__':
+
+    _usage = '''
+Usage:
+  python stream.py [ -e <encoding> ] [ -v lexrank | clexrank | divrank ]
+                   [ -w <window> ] [ -n <interval> ]
+                   [ -s <sent_limit> | -c <char_limit> | -i <imp_required> ]
+  Args:
+    (reads text from stdin and prints summary every <interval> lines)
+    -e: input and output encoding (default: utf-8)
+    -v: variant of LexRank (default is 'lexrank')
+    -w: the number of latest sentences to be summarized (default: all)
+    -n: print summary every n lines (default: only at the end)
+    -s: summary length (the number of sentences)
+    -c: summary length (the number of charactors)
+    -i: cumulative LexRank score [0.0-1.0]
+    '''.strip()
+
+    options, args = getopt.getopt(sys.argv[1:], 'e:v:w:n:s:c:i:')
+    options = dict(options)
+
+    if len(options) == 0 or len(args) > 0:
+        print _usage
+        sys.exit(0)
+
+    encoding = options['-e'] if '-e' in options else 'utf-8'
+    variant = options['-v'] if '-v' in options else 'lexrank'
+    window = int(options['-w']) if '-w' in options else None
+    interval = int(options['-n']) if '-n' in options else None
+    summarize_params = {
+        'sent_limit': int(options['-s']) if '-s' in options else None,
+        'char_limit': int(options['-c']) if '-c' in options else None,
+        'imp_require': float(options['-i']) if '-i' in options else None
+    }
+
+    summarizer = IncrementalSummarizer(
+        continuous=variant == 'clexrank', use_divrank=variant == 'divrank',
+        window=window
+    )
+
+    def print_summary():
+        sentences, debug_info = summarizer.summarize(**summarize_params)
+        for sent in sentences:
+            print sent.strip().encode(encoding)
+        sys.stdout.flush()
+
+    for i, line in enumerate(iter(sys.stdin.readline, '')):
+        summarizer.feed(line.decode(encoding))
+        if interval is not None and (i + 1) % interval == 0:
+            print_summary()
+            print
+    summarizer.flush()
+    print_summary()
@@ -4,6 +4,9 @@
 import os
 import re
 import json
+import atexit
+
+from .misc.cache import LRUCache, DiskStore
 
 
 def tree_encode(obj, encoding='utf-8'):
@@ -22,23 +25,59 @@ def tree_encode(obj, encoding='utf-8'):
         return obj
 
 
-def sent_splitter_ja(text, delimiters=set(u'。．？！\n\r'),
-                     parenthesis=u'（）「」『』“”'):
+_splitter_regex_cache = {}
+
+
+def _splitter_regex(delimiters, parenthesis):
+    '''
+    returns compiled regex that matches a parenthesis character or
+    a run of delimiters (None if there is nothing to match)
+    '''
+    key = (frozenset(delimiters), parenthesis)
+    if key in _splitter_regex_cache:
+        return _splitter_regex_cache[key]
+
+    paren_chars = set(parenthesis)
+    delim_chars = set(delimiters) - paren_chars
+    patterns = []
+    if len(paren_chars) > 0:
+        patterns.append(
+            u'[' + u''.join(re.escape(c) for c in sorted(paren_chars)) + u']'
+        )
+    if len(delim_chars) > 0:
+        patterns.append(
+            u'[' + u''.join(re.escape(c) for c in sorted(delim_chars)) + u']+'
+        )
+    regex = re.compile(u'|'.join(patterns)) if len(patterns) > 0 else None
+
+    if len(_splitter_regex_cache) > 100:
+        _splitter_regex_cache.clear()
+    _splitter_regex_cache[key] = regex
+    return regex
+
+
+def sent_spans_ja(text, delimiters=set(u'。．？！\n\r'),
+                  parenthesis=u'（）「」『』“”'):
     '''
     Args:
       text: unicode string that contains multiple Japanese sentences.
       delimiters: set() of sentence delimiter characters.
       parenthesis: to be checked its correspondence.
     Returns:
-      generator that yields sentences.
+      generator that yields (start, end) offsets of sentences,
+      i.e. text[start:end] is a sentence.
     '''
+    regex = _splitter_regex(delimiters, parenthesis)
     paren_chars = set(parenthesis)
     close2open = dict(zip(parenthesis[1::2], parenthesis[0::2]))
     pstack = []
-    buff = []
+    start = 0
+    text_len = len(text)
 
-    for i, c in enumerate(text):
-        c_next = text[i+1] if i+1 < len(text) else None
+    # only delimiters and parenthesis are visited
+    for m in (regex.finditer(text) if regex is not None else ()):
+        i, end = m.span()
+        c = text[i]
         # check correspondence of parenthesis
         if c in paren_chars:
             if c in close2open:  # close
@@ -46,24 +85,151 @@ def sent_splitter_ja(text, delimiters=set(u'。．？！\n\r'),
                     pstack.pop()
             else:  # open
                 pstack.append(c)
+            if c not in delimiters:
+                continue
+
+        # split after the last delimiter of a run
+        if len(pstack) == 0 and (
+                end == text_len or text[end] not in delimiters):
+            yield start, end
+            start = end
 
-        buff.append(c)
-        if c in delimiters:
-            if len(pstack) == 0 and c_next not in delimiters:
-                yield ''.join(buff)
-                buff = []
+    if start < text_len:
+        yield start, text_len
 
-    if len(buff) > 0:
-        yield ''.join(buff)
+
+def sent_splitter_ja(text, delimiters=set(u'。．？！\n\r'),
+                     parenthesis=u'（）「」『』“”'):
+    '''
+    Args:
+      text: unicode string that contains multiple Japanese sentences.
+      delimiters: set() of sentence delimiter characters.
+      parenthesis: to be checked its correspondence.
+    Returns:
+      generator that yields sentences.
+    '''
+    for start, end in sent_spans_ja(text, delimiters, parenthesis):
+        yield text[start:end]
 
 
 if os.environ.get('SUMMPY_USE_JANOME') is not None:
-    from .misc.janome_segmenter import word_segmenter_ja
+    from .misc import janome_segmenter as segmenter
 else:
     try:
-        from .misc.mecab_segmenter import word_segmenter_ja
+        from .misc import mecab_segmenter as segmenter
     except ImportError:
-        from .misc.janome_segmenter import word_segmenter_ja
+        from .misc import janome_segmenter as segmenter
+
+
+def warmup():
+    '''
+    load the dictionary of the word segmenter, which is loaded on the
+    first sentence otherwise
+    '''
+    segmenter.warmup()
+
+
+_segmenter_cache = None
+_segmenter_cache_config = {}
+
+
+def configure_segmenter_cache(max_entries=10000, max_bytes=None, path=None):
+    '''
+    configure the cache of word_segmenter_ja.
+
+    Args:
+      max_entries: the maximum number of cached sentences (0 disables cache)
+      max_bytes: the maximum total size of cached words (None: unbounded)
+      path: if given, cached words are also stored in (and loaded from)
+        a sqlite3 file at the path, so that the cache survives restarts.
+    '''
+    global _segmenter_cache
+    if _segmenter_cache is not None and _segmenter_cache.store is not None:
+        _segmenter_cache.store.close()
+    _segmenter_cache_config.update(
+        max_entries=max_entries, max_bytes=max_bytes, path=path
+    )
+
+    if max_entries <= 0:
+        _segmenter_cache = None
+        return
+    store = DiskStore(path) if path is not None else None
+    _segmenter_cache = LRUCache(
+        max_entries=max_entries, max_bytes=max_bytes, store=store
+    )
+
+
+def reinit_segmenter_cache():
+    '''
+    create a new (empty) cache with the current configuration.
+    it must be called in forked worker processes, because the sqlite3
+    connection of the parent must not be used (nor closed) in the child.
+    '''
+    global _segmenter_cache
+    _segmenter_cache = None
+    configure_segmenter_cache(**_segmenter_cache_config)
+
+
+def segmenter_cache_stats():
+    '''
+    Returns:
+      dict of hits, misses, evictions, entries and bytes
+      (None if cache is disabled)
+    '''
+    if _segmenter_cache is None:
+        return None
+    return _segmenter_cache.stats()
+
+
+def segmenter_config():
+    '''
+    Returns: tuple
+      (name of the segmenter module, sorted items of its config, e.g.
+       the user dictionary), which changes the words of sentences
+    '''
+    return (segmenter.__name__, tuple(sorted(segmenter.config.items())))
+
+
+def _segmenter_config_key(segmenter_params):
+    '''
+    returns hashable representation of segmenter (and its parameters),
+    or None if they cannot be identified (e.g. lambda functions).
+    '''
+    items = []
+    for name, value in sorted(segmenter_params.items()):
+        if callable(value):
+            if getattr(value, '__name__', '<lambda>') == '<lambda>':
+                return None
+            value = '{}.{}'.format(value.__module__, value.__name__)
+        items.append((name, value))
+    return (segmenter_config(), tuple(items))
+
+
+def word_segmenter_ja(sent, **segmenter_params):
+    '''
+    segment a sentence into words (see misc/*_segmenter.py).
+    results are cached by sentence and segmenter parameters.
+    '''
+    cache = _segmenter_cache
+    config_key = None
+    if cache is not None:
+        config_key = _segmenter_config_key(segmenter_params)
+    if config_key is None:
+        return segmenter.word_segmenter_ja(sent, **segmenter_params)
+
+    key = (config_key, sent)
+    words = cache.get(key)
+    if words is None:
+        words = tuple(segmenter.word_segmenter_ja(sent, **segmenter_params))
+        cache.put(key, words)
+    return list(words)
+
+
+configure_segmenter_cache(
+    max_entries=int(os.environ.get('SUMMPY_SEGMENTER_CACHE_SIZE', 10000)),
+    path=os.environ.get('SUMMPY_SEGMENTER_CACHE_PATH')
+)
+atexit.register(configure_segmenter_cache, max_entries=0)
 
 
 if __name__ == '__main__':